@@ -1,12 +1,20 @@
 """Admin API routes"""
-from fastapi import APIRouter, Depends, HTTPException, Header, Request
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, Response
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+import orjson
+from pydantic import BaseModel, ConfigDict, field_validator
+from urllib.parse import urlparse
 from typing import Optional, List
+import asyncio
+import hmac
 import secrets
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
 from ..core.auth import AuthManager
 from ..core.database import Database
 from ..core.config import config
+from ..core.logger import debug_logger
 from ..services.token_manager import TokenManager
 from ..services.proxy_manager import ProxyManager
 
@@ -17,8 +25,46 @@ token_manager: TokenManager = None
 proxy_manager: ProxyManager = None
 db: Database = None
 
-# Store active admin session tokens (in production, use Redis or database)
-active_admin_tokens = set()
+# Store active admin session tokens with expiry timestamps
+# (single-process deployment; swap for Redis SETEX if running multiple workers)
+ADMIN_SESSION_TTL = 86400  # 24 hours
+active_admin_tokens: dict = {}  # session token -> expiry timestamp
+
+# Immutable snapshot of the live session tokens, atomically replaced on
+# every mutation so readers never observe a half-updated container
+_admin_token_snapshot: frozenset = frozenset()
+
+
+def _rebuild_admin_snapshot():
+    global _admin_token_snapshot
+    _admin_token_snapshot = frozenset(active_admin_tokens)
+
+
+def _purge_expired_admin_tokens():
+    """Drop expired session tokens so the store doesn't grow unbounded"""
+    now = time.time()
+    expired = [t for t, expires_at in active_admin_tokens.items() if expires_at <= now]
+    for t in expired:
+        active_admin_tokens.pop(t, None)
+
+
+def _store_admin_session(session_token: str):
+    """Register a new admin session (purges stale sessions as a side effect)"""
+    _purge_expired_admin_tokens()
+    active_admin_tokens[session_token] = time.time() + ADMIN_SESSION_TTL
+    _rebuild_admin_snapshot()
+
+
+def _revoke_admin_session(session_token: str):
+    """Invalidate a single admin session"""
+    active_admin_tokens.pop(session_token, None)
+    _rebuild_admin_snapshot()
+
+
+def _revoke_all_admin_sessions():
+    """Invalidate every admin session (e.g. after password change)"""
+    active_admin_tokens.clear()
+    _rebuild_admin_snapshot()
 
 
 def set_dependencies(tm: TokenManager, pm: ProxyManager, database: Database):
@@ -27,6 +73,26 @@ def set_dependencies(tm: TokenManager, pm: ProxyManager, database: Database):
     token_manager = tm
     proxy_manager = pm
     db = database
+    # 使用计数落盘也会改 /api/proxy-pool/list 的载荷,必须推进版本号
+    db.on_proxy_usage_flushed = _bump_proxy_pool_version
+
+
+# fire-and-forget 任务的引用集合:事件循环只弱引用 task,
+# 不持有引用可能在运行前被回收,异常也无人观察
+_background_tasks = set()
+
+
+def _config_reload_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        debug_logger.log_error(f"[CONFIG] 配置热重载失败: {task.exception()}")
+
+
+def _reload_config_in_background():
+    """后台热重载配置 (仅用于响应不依赖重载结果的端点)"""
+    task = asyncio.create_task(db.reload_config_to_memory())
+    _background_tasks.add(task)
+    task.add_done_callback(_config_reload_done)
 
 
 # ========== Request Models ==========
@@ -92,7 +158,13 @@ class ST2ATRequest(BaseModel):
 
 
 class ImportTokenItem(BaseModel):
-    """导入Token项"""
+    """导入Token项
+
+    批量导入会校验成百上千个条目,显式忽略未知字段,
+    保持 pydantic-core 的单遍 Rust 校验路径。
+    """
+    model_config = ConfigDict(extra="ignore")
+
     email: Optional[str] = None
     access_token: Optional[str] = None
     session_token: Optional[str] = None
@@ -105,20 +177,42 @@ class ImportTokenItem(BaseModel):
 
 class ImportTokensRequest(BaseModel):
     """导入Token请求"""
+    model_config = ConfigDict(extra="ignore")
+
     tokens: List[ImportTokenItem]
 
 
+def _parse_at_expires(expires: Optional[str]) -> Optional[datetime]:
+    """解析 Flow 返回的 AT 过期时间 (Python 3.11+ 原生支持 'Z' 后缀)"""
+    if not expires:
+        return None
+    try:
+        return datetime.fromisoformat(expires)
+    except ValueError:
+        return None
+
+
 # ========== Auth Middleware ==========
 
 async def verify_admin_token(authorization: str = Header(None)):
-    """Verify admin session token (NOT API key)"""
-    if not authorization or not authorization.startswith("Bearer "):
+    """Verify admin session token (NOT API key)
+
+    Kept pure-async so FastAPI never hops to the threadpool for it, and
+    resolved at most once per request via the default dependency cache.
+    验证只查进程内 TTL 字典,无哈希无 DB;改密码时全量吊销会话使其失效。
+    """
+    # Single slice comparison instead of startswith + second slice
+    if not authorization or authorization[:7] != "Bearer ":
         raise HTTPException(status_code=401, detail="Missing authorization")
 
     token = authorization[7:]
 
-    # Check if token is in active session tokens
-    if token not in active_admin_tokens:
+    # Fast rejection against the immutable snapshot, then TTL enforcement
+    if token not in _admin_token_snapshot:
+        raise HTTPException(status_code=401, detail="Invalid or expired admin token")
+
+    if active_admin_tokens.get(token, 0) <= time.time():
+        _revoke_admin_session(token)
         raise HTTPException(status_code=401, detail="Invalid or expired admin token")
 
     return token
@@ -137,8 +231,8 @@ async def admin_login(request: LoginRequest):
     # Generate independent session token
     session_token = f"admin-{secrets.token_urlsafe(32)}"
 
-    # Store in active tokens
-    active_admin_tokens.add(session_token)
+    # Store in active tokens with TTL
+    _store_admin_session(session_token)
 
     return {
         "success": True,
@@ -150,7 +244,7 @@ async def admin_login(request: LoginRequest):
 @router.post("/api/admin/logout")
 async def admin_logout(token: str = Depends(verify_admin_token)):
     """Admin logout - invalidate session token"""
-    active_admin_tokens.discard(token)
+    _revoke_admin_session(token)
     return {"success": True, "message": "退出登录成功"}
 
 
@@ -173,53 +267,60 @@ async def change_password(
 
     await db.update_admin_config(**update_params)
 
-    # 🔥 Hot reload: sync database config to memory
+    # 🔥 Hot reload: 必须等重载完成 —— 登录校验读的是内存里的 config,
+    # 下面马上吊销所有会话,旧密码多存在一刻都会放进来一次过期登录
     await db.reload_config_to_memory()
 
     # 🔑 Invalidate all admin session tokens (force re-login for security)
-    active_admin_tokens.clear()
+    _revoke_all_admin_sessions()
 
     return {"success": True, "message": "密码修改成功,请重新登录"}
 
 
 # ========== Token Management ==========
 
-@router.get("/api/tokens")
+def _iso(dt: Optional[datetime]) -> Optional[str]:
+    """isoformat() or None, bound once for the token-list hot loop"""
+    return dt.isoformat() if dt else None
+
+
+def _token_entry(t, stats) -> dict:
+    """Shape one token row for the admin token list"""
+    return {
+        "id": t.id,
+        "st": t.st,  # Session Token for editing
+        "at": t.at,  # Access Token for editing (从ST转换而来)
+        "at_expires": _iso(t.at_expires),  # 🆕 AT过期时间
+        "token": t.at,  # 兼容前端 token.token 的访问方式
+        "email": t.email,
+        "name": t.name,
+        "remark": t.remark,
+        "is_active": t.is_active,
+        "created_at": _iso(t.created_at),
+        "last_used_at": _iso(t.last_used_at),
+        "use_count": t.use_count,
+        "credits": t.credits,  # 🆕 余额
+        "user_paygate_tier": t.user_paygate_tier,
+        "current_project_id": t.current_project_id,  # 🆕 项目ID
+        "current_project_name": t.current_project_name,  # 🆕 项目名称
+        "image_enabled": t.image_enabled,
+        "video_enabled": t.video_enabled,
+        "image_concurrency": t.image_concurrency,
+        "video_concurrency": t.video_concurrency,
+        "image_count": stats.image_count if stats else 0,
+        "video_count": stats.video_count if stats else 0,
+        "error_count": stats.error_count if stats else 0
+    }
+
+
+@router.get("/api/tokens", response_class=ORJSONResponse)
 async def get_tokens(token: str = Depends(verify_admin_token)):
     """Get all tokens with statistics"""
     tokens = await token_manager.get_all_tokens()
-    result = []
+    stats_map = await db.get_all_token_stats()
 
-    for t in tokens:
-        stats = await db.get_token_stats(t.id)
-
-        result.append({
-            "id": t.id,
-            "st": t.st,  # Session Token for editing
-            "at": t.at,  # Access Token for editing (从ST转换而来)
-            "at_expires": t.at_expires.isoformat() if t.at_expires else None,  # 🆕 AT过期时间
-            "token": t.at,  # 兼容前端 token.token 的访问方式
-            "email": t.email,
-            "name": t.name,
-            "remark": t.remark,
-            "is_active": t.is_active,
-            "created_at": t.created_at.isoformat() if t.created_at else None,
-            "last_used_at": t.last_used_at.isoformat() if t.last_used_at else None,
-            "use_count": t.use_count,
-            "credits": t.credits,  # 🆕 余额
-            "user_paygate_tier": t.user_paygate_tier,
-            "current_project_id": t.current_project_id,  # 🆕 项目ID
-            "current_project_name": t.current_project_name,  # 🆕 项目名称
-            "image_enabled": t.image_enabled,
-            "video_enabled": t.video_enabled,
-            "image_concurrency": t.image_concurrency,
-            "video_concurrency": t.video_concurrency,
-            "image_count": stats.image_count if stats else 0,
-            "video_count": stats.video_count if stats else 0,
-            "error_count": stats.error_count if stats else 0
-        })
-
-    return result  # 直接返回数组,兼容前端
+    # 直接返回数组,兼容前端 (返回Response实例,跳过FastAPI的序列化管线)
+    return ORJSONResponse([_token_entry(t, stats_map.get(t.id)) for t in tokens])
 
 
 @router.post("/api/tokens")
@@ -271,13 +372,7 @@ async def update_token(
         expires = result.get("expires")
 
         # 解析过期时间
-        from datetime import datetime
-        at_expires = None
-        if expires:
-            try:
-                at_expires = datetime.fromisoformat(expires.replace('Z', '+00:00'))
-            except:
-                pass
+        at_expires = _parse_at_expires(expires)
 
         # 更新token (包含AT、ST、AT过期时间、project_id和project_name)
         await token_manager.update_token(
@@ -358,10 +453,10 @@ async def refresh_at(
     
     如果 AT 刷新失败且处于 personal 模式，会自动尝试通过浏览器刷新 ST
     """
-    from ..core.logger import debug_logger
-    from ..core.config import config
-    
-    debug_logger.log_info(f"[API] 手动刷新 AT 请求: token_id={token_id}, captcha_method={config.captcha_method}")
+    # 绑定一次,避免重复走 config 的属性/字典链
+    captcha_method = config.captcha_method
+
+    debug_logger.log_info(f"[API] 手动刷新 AT 请求: token_id={token_id}, captcha_method={captcha_method}")
     
     try:
         # 调用token_manager的内部刷新方法（包含 ST 自动刷新逻辑）
@@ -372,7 +467,7 @@ async def refresh_at(
             updated_token = await token_manager.get_token(token_id)
             
             message = "AT刷新成功"
-            if config.captcha_method == "personal":
+            if captcha_method == "personal":
                 message += "（支持ST自动刷新）"
             
             debug_logger.log_info(f"[API] AT 刷新成功: token_id={token_id}")
@@ -390,8 +485,8 @@ async def refresh_at(
             debug_logger.log_error(f"[API] AT 刷新失败: token_id={token_id}")
             
             error_detail = "AT刷新失败"
-            if config.captcha_method != "personal":
-                error_detail += f"（当前打码模式: {config.captcha_method}，ST自动刷新仅在 personal 模式下可用）"
+            if captcha_method != "personal":
+                error_detail += f"（当前打码模式: {captcha_method}，ST自动刷新仅在 personal 模式下可用）"
             
             raise HTTPException(status_code=500, detail=error_detail)
     except HTTPException:
@@ -426,83 +521,97 @@ async def import_tokens(
     token: str = Depends(verify_admin_token)
 ):
     """批量导入Token"""
-    from datetime import datetime, timezone
-
     added = 0
     updated = 0
     errors = []
+    expired_ids = []  # 过期Token统一在循环后批量禁用
+
+    # 并发执行 ST 转 AT (限制并发数,避免打爆上游)
+    sem = asyncio.Semaphore(10)
 
+    async def _convert(idx: int, item: ImportTokenItem):
+        async with sem:
+            try:
+                result = await token_manager.flow_client.st_to_at(item.session_token)
+                return idx, item, result, None
+            except Exception as e:
+                return idx, item, None, e
+
+    tasks = []
     for idx, item in enumerate(request.tokens):
+        if not item.session_token:
+            errors.append(f"第{idx+1}项: 缺少 session_token")
+            continue
+        tasks.append(_convert(idx, item))
+
+    outcomes = await asyncio.gather(*tasks) if tasks else []
+
+    # 一次性读取现有Token并按邮箱索引,避免每项都全表查询
+    existing_tokens = await token_manager.get_all_tokens()
+    tokens_by_email = {t.email: t for t in existing_tokens}
+
+    for idx, item, result, convert_error in outcomes:
         try:
             st = item.session_token
 
-            if not st:
-                errors.append(f"第{idx+1}项: 缺少 session_token")
+            if convert_error:
+                errors.append(f"第{idx+1}项: {str(convert_error)}")
                 continue
 
-            # 使用 ST 转 AT 获取用户信息
-            try:
-                result = await token_manager.flow_client.st_to_at(st)
-                at = result["access_token"]
-                email = result.get("user", {}).get("email")
-                expires = result.get("expires")
-
-                if not email:
-                    errors.append(f"第{idx+1}项: 无法获取邮箱信息")
-                    continue
-
-                # 解析过期时间
-                at_expires = None
-                is_expired = False
-                if expires:
-                    try:
-                        at_expires = datetime.fromisoformat(expires.replace('Z', '+00:00'))
-                        # 判断是否过期
-                        now = datetime.now(timezone.utc)
-                        is_expired = at_expires <= now
-                    except:
-                        pass
-
-                # 使用邮箱检查是否已存在
-                existing_tokens = await token_manager.get_all_tokens()
-                existing = next((t for t in existing_tokens if t.email == email), None)
-
-                if existing:
-                    # 更新现有Token
-                    await token_manager.update_token(
-                        token_id=existing.id,
-                        st=st,
-                        at=at,
-                        at_expires=at_expires,
-                        image_enabled=item.image_enabled,
-                        video_enabled=item.video_enabled,
-                        image_concurrency=item.image_concurrency,
-                        video_concurrency=item.video_concurrency
-                    )
-                    # 如果过期则禁用
-                    if is_expired:
-                        await token_manager.disable_token(existing.id)
-                    updated += 1
-                else:
-                    # 添加新Token
-                    new_token = await token_manager.add_token(
-                        st=st,
-                        image_enabled=item.image_enabled,
-                        video_enabled=item.video_enabled,
-                        image_concurrency=item.image_concurrency,
-                        video_concurrency=item.video_concurrency
-                    )
-                    # 如果过期则禁用
-                    if is_expired:
-                        await token_manager.disable_token(new_token.id)
-                    added += 1
+            at = result["access_token"]
+            email = result.get("user", {}).get("email")
+            expires = result.get("expires")
 
-            except Exception as e:
-                errors.append(f"第{idx+1}项: {str(e)}")
+            if not email:
+                errors.append(f"第{idx+1}项: 无法获取邮箱信息")
+                continue
+
+            # 解析过期时间并判断是否过期
+            at_expires = _parse_at_expires(expires)
+            is_expired = at_expires is not None and at_expires <= datetime.now(timezone.utc)
+
+            # 使用邮箱检查是否已存在
+            existing = tokens_by_email.get(email)
+
+            if existing:
+                # 更新现有Token
+                await token_manager.update_token(
+                    token_id=existing.id,
+                    st=st,
+                    at=at,
+                    at_expires=at_expires,
+                    image_enabled=item.image_enabled,
+                    video_enabled=item.video_enabled,
+                    image_concurrency=item.image_concurrency,
+                    video_concurrency=item.video_concurrency
+                )
+                # 如果过期则禁用
+                if is_expired:
+                    expired_ids.append(existing.id)
+                updated += 1
+            else:
+                # 添加新Token
+                new_token = await token_manager.add_token(
+                    st=st,
+                    image_enabled=item.image_enabled,
+                    video_enabled=item.video_enabled,
+                    image_concurrency=item.image_concurrency,
+                    video_concurrency=item.video_concurrency
+                )
+                # 如果过期则禁用
+                if is_expired:
+                    expired_ids.append(new_token.id)
+                # 记录到索引,同一批次内重复邮箱走更新分支
+                tokens_by_email[email] = new_token
+                added += 1
 
         except Exception as e:
             errors.append(f"第{idx+1}项: {str(e)}")
 
+    # 批量禁用过期Token,一次UPDATE代替逐条round-trip
+    if expired_ids:
+        await token_manager.disable_tokens_bulk(expired_ids)
+
     return {
         "success": True,
         "added": added,
@@ -579,80 +688,50 @@ async def update_generation_config(
     await db.update_generation_config(request.image_timeout, request.video_timeout)
 
     # 🔥 Hot reload: sync database config to memory
-    await db.reload_config_to_memory()
+    # 响应不依赖重载结果,fire-and-forget 把重载延迟移出请求路径
+    _reload_config_in_background()
 
     return {"success": True, "message": "生成配置更新成功"}
 
 
 # ========== System Info ==========
 
-@router.get("/api/system/info")
+@router.get("/api/system/info", response_class=ORJSONResponse)
 async def get_system_info(token: str = Depends(verify_admin_token)):
     """Get system information"""
     tokens = await token_manager.get_all_tokens()
-    active_tokens = [t for t in tokens if t.is_active]
 
-    total_credits = sum(t.credits for t in active_tokens)
+    # Single pass: count active tokens and sum credits without an
+    # intermediate filtered list
+    active_tokens = 0
+    total_credits = 0
+    for t in tokens:
+        if t.is_active:
+            active_tokens += 1
+            total_credits += t.credits
 
-    return {
+    return ORJSONResponse({
         "success": True,
         "info": {
             "total_tokens": len(tokens),
-            "active_tokens": len(active_tokens),
+            "active_tokens": active_tokens,
             "total_credits": total_credits,
             "version": "1.0.0"
         }
-    }
+    })
 
 
 # ========== Additional Routes for Frontend Compatibility ==========
+# 别名路由直接注册同一个 handler,省掉一层 async 包装调用
+router.add_api_route("/api/login", admin_login, methods=["POST"])
+router.add_api_route("/api/logout", admin_logout, methods=["POST"])
 
-@router.post("/api/login")
-async def login(request: LoginRequest):
-    """Login endpoint (alias for /api/admin/login)"""
-    return await admin_login(request)
-
-
-@router.post("/api/logout")
-async def logout(token: str = Depends(verify_admin_token)):
-    """Logout endpoint (alias for /api/admin/logout)"""
-    return await admin_logout(token)
 
-
-@router.get("/api/stats")
+@router.get("/api/stats", response_class=ORJSONResponse)
 async def get_stats(token: str = Depends(verify_admin_token)):
     """Get statistics for dashboard"""
-    tokens = await token_manager.get_all_tokens()
-    active_tokens = [t for t in tokens if t.is_active]
-
-    # Calculate totals
-    total_images = 0
-    total_videos = 0
-    total_errors = 0
-    today_images = 0
-    today_videos = 0
-    today_errors = 0
-
-    for t in tokens:
-        stats = await db.get_token_stats(t.id)
-        if stats:
-            total_images += stats.image_count
-            total_videos += stats.video_count
-            total_errors += stats.error_count  # Historical total errors
-            today_images += stats.today_image_count
-            today_videos += stats.today_video_count
-            today_errors += stats.today_error_count
-
-    return {
-        "total_tokens": len(tokens),
-        "active_tokens": len(active_tokens),
-        "total_images": total_images,
-        "total_videos": total_videos,
-        "total_errors": total_errors,
-        "today_images": today_images,
-        "today_videos": today_videos,
-        "today_errors": today_errors
-    }
+    # Aggregate everything SQL-side: constant work regardless of token count
+    return ORJSONResponse(await db.get_global_stats())
 
 
 @router.get("/api/logs")
@@ -661,20 +740,19 @@ async def get_logs(
     token: str = Depends(verify_admin_token)
 ):
     """Get request logs with token email"""
+    # 查询在持锁期间完成,序列化不占数据库连接;逐行 orjson 编码流式下发,
+    # 大 request_body/response_body 的日志页不用先拼出整个数组的字节串
     logs = await db.get_logs(limit=limit)
 
-    return [{
-        "id": log.get("id"),
-        "token_id": log.get("token_id"),
-        "token_email": log.get("token_email"),
-        "token_username": log.get("token_username"),
-        "operation": log.get("operation"),
-        "status_code": log.get("status_code"),
-        "duration": log.get("duration"),
-        "created_at": log.get("created_at"),
-        "request_body": log.get("request_body"),
-        "response_body": log.get("response_body")
-    } for log in logs]
+    def render():
+        yield b"["
+        for i, log in enumerate(logs):
+            if i:
+                yield b","
+            yield orjson.dumps(log)
+        yield b"]"
+
+    return StreamingResponse(render(), media_type="application/json")
 
 
 @router.delete("/api/logs")
@@ -712,13 +790,7 @@ async def update_admin_config(
     return {"success": True, "message": "配置更新成功"}
 
 
-@router.post("/api/admin/password")
-async def update_admin_password(
-    request: ChangePasswordRequest,
-    token: str = Depends(verify_admin_token)
-):
-    """Update admin password"""
-    return await change_password(request, token)
+router.add_api_route("/api/admin/password", change_password, methods=["POST"])
 
 
 @router.post("/api/admin/apikey")
@@ -730,7 +802,8 @@ async def update_api_key(
     # Update API key in database
     await db.update_admin_config(api_key=request.new_api_key)
 
-    # 🔥 Hot reload: sync database config to memory
+    # 🔥 Hot reload: 必须等重载完成 —— verify_api_key 读内存 config,
+    # 返回成功后新 key 就应立即生效、旧 key 立即失效
     await db.reload_config_to_memory()
 
     return {"success": True, "message": "API Key更新成功"}
@@ -753,24 +826,8 @@ async def update_debug_config(
         raise HTTPException(status_code=500, detail=f"Failed to update debug config: {str(e)}")
 
 
-@router.get("/api/generation/timeout")
-async def get_generation_timeout(token: str = Depends(verify_admin_token)):
-    """Get generation timeout configuration"""
-    return await get_generation_config(token)
-
-
-@router.post("/api/generation/timeout")
-async def update_generation_timeout(
-    request: GenerationConfigRequest,
-    token: str = Depends(verify_admin_token)
-):
-    """Update generation timeout configuration"""
-    await db.update_generation_config(request.image_timeout, request.video_timeout)
-
-    # 🔥 Hot reload: sync database config to memory
-    await db.reload_config_to_memory()
-
-    return {"success": True, "message": "生成配置更新成功"}
+router.add_api_route("/api/generation/timeout", get_generation_config, methods=["GET"])
+router.add_api_route("/api/generation/timeout", update_generation_config, methods=["POST"])
 
 
 # ========== AT Auto Refresh Config ==========
@@ -828,7 +885,8 @@ async def update_cache_enabled(
     await db.update_cache_config(enabled=enabled)
 
     # 🔥 Hot reload: sync database config to memory
-    await db.reload_config_to_memory()
+    # 响应不依赖重载结果,fire-and-forget 把重载延迟移出请求路径
+    _reload_config_in_background()
 
     return {"success": True, "message": f"缓存已{'启用' if enabled else '禁用'}"}
 
@@ -846,7 +904,8 @@ async def update_cache_config_full(
     await db.update_cache_config(enabled=enabled, timeout=timeout, base_url=base_url)
 
     # 🔥 Hot reload: sync database config to memory
-    await db.reload_config_to_memory()
+    # 响应不依赖重载结果,fire-and-forget 把重载延迟移出请求路径
+    _reload_config_in_background()
 
     return {"success": True, "message": "缓存配置更新成功"}
 
@@ -861,7 +920,8 @@ async def update_cache_base_url(
     await db.update_cache_config(base_url=base_url)
 
     # 🔥 Hot reload: sync database config to memory
-    await db.reload_config_to_memory()
+    # 响应不依赖重载结果,fire-and-forget 把重载延迟移出请求路径
+    _reload_config_in_background()
 
     return {"success": True, "message": "缓存Base URL更新成功"}
 
@@ -895,7 +955,8 @@ async def update_captcha_config(
     )
 
     # 🔥 Hot reload: sync database config to memory
-    await db.reload_config_to_memory()
+    # 响应不依赖重载结果,fire-and-forget 把重载延迟移出请求路径
+    _reload_config_in_background()
 
     return {"success": True, "message": "验证码配置更新成功"}
 
@@ -915,30 +976,47 @@ async def get_captcha_config(token: str = Depends(verify_admin_token)):
 
 # ========== Plugin Configuration Endpoints ==========
 
-@router.get("/api/plugin/config")
-async def get_plugin_config(request: Request, token: str = Depends(verify_admin_token)):
-    """Get plugin configuration"""
-    plugin_config = await db.get_plugin_config()
+@lru_cache(maxsize=32)
+def _plugin_connection_url(host_header: str) -> str:
+    """Build the extension connection URL, memoised per Host header
 
-    # Get the actual domain and port from the request
-    # This allows the connection URL to reflect the user's actual access path
-    host_header = request.headers.get("host", "")
-
-    # Generate connection URL based on actual request
+    Uses the actual domain/IP and port from the request so the URL
+    reflects the user's access path, falling back to the configured
+    server address when no Host header is present.
+    """
     if host_header:
-        # Use the actual domain/IP and port from the request
-        connection_url = f"http://{host_header}/api/plugin/update-token"
-    else:
-        # Fallback to config-based URL
-        from ..core.config import config
-        server_host = config.server_host
-        server_port = config.server_port
+        return f"http://{host_header}/api/plugin/update-token"
 
-        if server_host == "0.0.0.0":
-            connection_url = f"http://127.0.0.1:{server_port}/api/plugin/update-token"
-        else:
-            connection_url = f"http://{server_host}:{server_port}/api/plugin/update-token"
+    server_host = config.server_host
+    server_port = config.server_port
+
+    if server_host == "0.0.0.0":
+        return f"http://127.0.0.1:{server_port}/api/plugin/update-token"
+    return f"http://{server_host}:{server_port}/api/plugin/update-token"
+
+
+# 轮询接口的资源版本号:写路径自增,GET 端用弱 ETag 命中时直接 304。
+# 以启动时间为种子:重启后的计数不会撞上上个进程发出的 ETag,
+# 否则客户端缓存的旧 ETag 可能对已变化的内容错误命中 304。
+# 不变量:任何会改动对应 GET 载荷的写路径都必须推进版本号——代理池
+# 除了本文件的增删改切换,还包括使用计数落盘(set_dependencies 里
+# 把 _bump_proxy_pool_version 挂到 Database.on_proxy_usage_flushed)
+_plugin_config_version = int(time.time())
+_proxy_pool_version = int(time.time())
+
+
+@router.get("/api/plugin/config", response_class=ORJSONResponse)
+async def get_plugin_config(request: Request, response: Response, token: str = Depends(verify_admin_token)):
+    """Get plugin configuration"""
+    etag = f'W/"{_plugin_config_version}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304)
+
+    plugin_config = await db.get_plugin_config()
 
+    connection_url = _plugin_connection_url(request.headers.get("host", ""))
+
+    response.headers["ETag"] = etag
     return {
         "success": True,
         "config": {
@@ -949,24 +1027,47 @@ async def get_plugin_config(request: Request, token: str = Depends(verify_admin_
     }
 
 
+class PluginConfigUpdate(BaseModel):
+    connection_token: str = ""
+    auto_enable_on_update: bool = True  # 默认开启
+
+
+class PluginTokenUpdate(BaseModel):
+    session_token: str
+
+
 @router.post("/api/plugin/config")
 async def update_plugin_config(
-    request: dict,
+    request: PluginConfigUpdate,
     token: str = Depends(verify_admin_token)
 ):
     """Update plugin configuration"""
-    connection_token = request.get("connection_token", "")
-    auto_enable_on_update = request.get("auto_enable_on_update", True)  # 默认开启
+    connection_token = request.connection_token
+    auto_enable_on_update = request.auto_enable_on_update
 
     # Generate random token if empty
     if not connection_token:
         connection_token = secrets.token_urlsafe(32)
 
+    # 表单原样保存很常见:配置没变就不写库、不涨版本号
+    current = await db.get_plugin_config()
+    if (connection_token == current.connection_token
+            and auto_enable_on_update == current.auto_enable_on_update):
+        return {
+            "success": True,
+            "message": "插件配置未变更",
+            "connection_token": connection_token,
+            "auto_enable_on_update": auto_enable_on_update
+        }
+
     await db.update_plugin_config(
         connection_token=connection_token,
         auto_enable_on_update=auto_enable_on_update
     )
 
+    global _plugin_config_version
+    _plugin_config_version += 1
+
     return {
         "success": True,
         "message": "插件配置更新成功",
@@ -975,29 +1076,28 @@ async def update_plugin_config(
     }
 
 
+# SQLite 单写者:串行化插件写入,避免并发任务都阻塞在数据库写锁上
+_plugin_write_lock = asyncio.Lock()
+
+
 @router.post("/api/plugin/update-token")
-async def plugin_update_token(request: dict, authorization: Optional[str] = Header(None)):
+async def plugin_update_token(request: PluginTokenUpdate, authorization: Optional[str] = Header(None)):
     """Receive token update from Chrome extension (no admin auth required, uses connection_token)"""
-    # Verify connection token
+    # Verify connection token (config 走进程内缓存,未授权请求不碰 DB)
     plugin_config = await db.get_plugin_config()
 
     # Extract token from Authorization header
-    provided_token = None
-    if authorization:
-        if authorization.startswith("Bearer "):
-            provided_token = authorization[7:]
-        else:
-            provided_token = authorization
+    provided_token = (authorization or "").removeprefix("Bearer ").strip()
 
-    # Check if token matches
-    if not plugin_config.connection_token or provided_token != plugin_config.connection_token:
+    # 常数时间比较,避免 != 的时序侧信道;按字节比较——compare_digest
+    # 对含非 ASCII 字符的 str 会抛 TypeError,而 header 里是允许出现的
+    if not plugin_config.connection_token or not hmac.compare_digest(
+        provided_token.encode(), plugin_config.connection_token.encode()
+    ):
         raise HTTPException(status_code=401, detail="Invalid connection token")
 
-    # Extract session token from request
-    session_token = request.get("session_token")
-
-    if not session_token:
-        raise HTTPException(status_code=400, detail="Missing session_token")
+    # Extract session token from request (缺失由 Pydantic 以 422 拒绝)
+    session_token = request.session_token
 
     # Step 1: Convert ST to AT to get user info (including email)
     try:
@@ -1010,15 +1110,11 @@ async def plugin_update_token(request: dict, authorization: Optional[str] = Head
         if not email:
             raise HTTPException(status_code=400, detail="Failed to get email from session token")
 
-        # Parse expiration time
-        from datetime import datetime
-        at_expires = None
-        if expires:
-            try:
-                at_expires = datetime.fromisoformat(expires.replace('Z', '+00:00'))
-            except:
-                pass
+        # Parse expiration time (3.11+ 的 fromisoformat 原生支持 'Z' 后缀)
+        at_expires = _parse_at_expires(expires)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid session token: {str(e)}")
 
@@ -1038,22 +1134,24 @@ async def plugin_update_token(request: dict, authorization: Optional[str] = Head
             print(f"[PLUGIN_UPDATE] ST changed: {existing_token.st != session_token}")
             print(f"[PLUGIN_UPDATE] New AT expires: {at_expires}")
             
-            # Update token
-            await token_manager.update_token(
-                token_id=existing_token.id,
-                st=session_token,
-                at=at,
-                at_expires=at_expires
-            )
-            
-            # Verify update
-            updated_token = await db.get_token(existing_token.id)
-            updated_st_preview = f"{updated_token.st[:10]}...{updated_token.st[-10:]}" if updated_token.st and len(updated_token.st) > 20 else (updated_token.st or 'None')
-            print(f"[PLUGIN_UPDATE] After update ST: {updated_st_preview}")
-
-            # Check if auto-enable is enabled and token is disabled
-            if plugin_config.auto_enable_on_update and not existing_token.is_active:
-                await token_manager.enable_token(existing_token.id)
+            # Update token: 单条UPDATE同时写ST/AT并按需自动启用 (写入段串行化)
+            auto_enabled = bool(plugin_config.auto_enable_on_update and not existing_token.is_active)
+            async with _plugin_write_lock:
+                await token_manager.ingest_session_token(
+                    token_id=existing_token.id,
+                    st=session_token,
+                    at=at,
+                    at_expires=at_expires,
+                    auto_enable=auto_enabled
+                )
+
+            # Verify update (仅调试需要,正常路径省一次回读)
+            if config.debug_enabled:
+                updated_token = await db.get_token(existing_token.id)
+                updated_st_preview = f"{updated_token.st[:10]}...{updated_token.st[-10:]}" if updated_token.st and len(updated_token.st) > 20 else (updated_token.st or 'None')
+                print(f"[PLUGIN_UPDATE] After update ST: {updated_st_preview}")
+
+            if auto_enabled:
                 return {
                     "success": True,
                     "message": f"Token updated and auto-enabled for {email}",
@@ -1069,12 +1167,13 @@ async def plugin_update_token(request: dict, authorization: Optional[str] = Head
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to update token: {str(e)}")
     else:
-        # Add new token
+        # Add new token (写入段串行化,见 _plugin_write_lock)
         try:
-            new_token = await token_manager.add_token(
-                st=session_token,
-                remark="Added by Chrome Extension"
-            )
+            async with _plugin_write_lock:
+                new_token = await token_manager.add_token(
+                    st=session_token,
+                    remark="Added by Chrome Extension"
+                )
 
             return {
                 "success": True,
@@ -1088,33 +1187,86 @@ async def plugin_update_token(request: dict, authorization: Optional[str] = Head
 
 # ========== Proxy Pool Management ==========
 
+class OkResponse(BaseModel):
+    """成功响应:经 response_model 直接走 pydantic-core 序列化"""
+    success: bool = True
+    message: str
+
+
+class ProxyAddResponse(OkResponse):
+    proxy_id: int
+
+
+class ProxyToggleResponse(OkResponse):
+    enabled: bool
+
+
+_PROXY_URL_SCHEMES = ("http", "https", "socks5", "socks5h")
+
+
+def _validate_proxy_url(value: str) -> str:
+    """校验代理URL格式,非法输入在进入handler前以422拒绝"""
+    parsed = urlparse(value)
+    if parsed.scheme not in _PROXY_URL_SCHEMES or not parsed.hostname:
+        raise ValueError(
+            f"proxy_url 必须形如 scheme://host:port,scheme 取 {'/'.join(_PROXY_URL_SCHEMES)}"
+        )
+    return value
+
+
 class AddProxyRequest(BaseModel):
     proxy_url: str
     name: Optional[str] = None
 
+    @field_validator("proxy_url")
+    @classmethod
+    def check_proxy_url(cls, v: str) -> str:
+        return _validate_proxy_url(v)
+
 
 class UpdateProxyRequest(BaseModel):
     proxy_url: Optional[str] = None
     name: Optional[str] = None
     enabled: Optional[bool] = None
 
+    @field_validator("proxy_url")
+    @classmethod
+    def check_proxy_url(cls, v: Optional[str]) -> Optional[str]:
+        return _validate_proxy_url(v) if v is not None else None
+
 
 class ProxyPoolConfigRequest(BaseModel):
     pool_enabled: bool
     rotation_mode: Optional[str] = "round_robin"
 
 
-@router.get("/api/proxy-pool/list")
-async def get_proxy_pool_list(token: str = Depends(verify_admin_token)):
-    """Get all proxies in the pool"""
-    proxies = await proxy_manager.get_all_pool_proxies()
+@router.get("/api/proxy-pool/list", response_class=ORJSONResponse)
+async def get_proxy_pool_list(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    token: str = Depends(verify_admin_token)
+):
+    """Get proxies in the pool (可选 limit/offset 分页,分页下推到 SQL)"""
+    etag = f'W/"{_proxy_pool_version}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304)
+
+    proxies = await proxy_manager.get_all_pool_proxies(limit, offset)
+    response.headers["ETag"] = etag
     return {
         "success": True,
         "proxies": proxies
     }
 
 
-@router.post("/api/proxy-pool/add")
+def _bump_proxy_pool_version():
+    global _proxy_pool_version
+    _proxy_pool_version += 1
+
+
+@router.post("/api/proxy-pool/add", response_model=ProxyAddResponse)
 async def add_proxy_to_pool(
     request: AddProxyRequest,
     token: str = Depends(verify_admin_token)
@@ -1122,16 +1274,13 @@ async def add_proxy_to_pool(
     """Add a proxy to the pool"""
     try:
         proxy_id = await proxy_manager.add_pool_proxy(request.proxy_url, request.name)
-        return {
-            "success": True,
-            "message": "代理添加成功",
-            "proxy_id": proxy_id
-        }
+        _bump_proxy_pool_version()
+        return ProxyAddResponse(message="代理添加成功", proxy_id=proxy_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.put("/api/proxy-pool/{proxy_id}")
+@router.put("/api/proxy-pool/{proxy_id}", response_model=OkResponse)
 async def update_proxy_in_pool(
     proxy_id: int,
     request: UpdateProxyRequest,
@@ -1139,21 +1288,16 @@ async def update_proxy_in_pool(
 ):
     """Update a proxy in the pool"""
     try:
-        update_data = {}
-        if request.proxy_url is not None:
-            update_data["proxy_url"] = request.proxy_url
-        if request.name is not None:
-            update_data["name"] = request.name
-        if request.enabled is not None:
-            update_data["enabled"] = request.enabled
-        
-        await proxy_manager.update_pool_proxy(proxy_id, **update_data)
-        return {"success": True, "message": "代理更新成功"}
+        await proxy_manager.update_pool_proxy(
+            proxy_id, request.proxy_url, request.name, request.enabled
+        )
+        _bump_proxy_pool_version()
+        return OkResponse(message="代理更新成功")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.delete("/api/proxy-pool/{proxy_id}")
+@router.delete("/api/proxy-pool/{proxy_id}", response_model=OkResponse)
 async def delete_proxy_from_pool(
     proxy_id: int,
     token: str = Depends(verify_admin_token)
@@ -1161,7 +1305,8 @@ async def delete_proxy_from_pool(
     """Delete a proxy from the pool"""
     try:
         await proxy_manager.delete_pool_proxy(proxy_id)
-        return {"success": True, "message": "代理删除成功"}
+        _bump_proxy_pool_version()
+        return OkResponse(message="代理删除成功")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1176,7 +1321,7 @@ async def get_proxy_pool_config(token: str = Depends(verify_admin_token)):
     }
 
 
-@router.post("/api/proxy-pool/config")
+@router.post("/api/proxy-pool/config", response_model=OkResponse)
 async def update_proxy_pool_config(
     request: ProxyPoolConfigRequest,
     token: str = Depends(verify_admin_token)
@@ -1184,30 +1329,27 @@ async def update_proxy_pool_config(
     """Update proxy pool configuration"""
     try:
         await proxy_manager.update_pool_config(request.pool_enabled, request.rotation_mode)
-        return {"success": True, "message": "代理池配置更新成功"}
+        return OkResponse(message="代理池配置更新成功")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/api/proxy-pool/{proxy_id}/toggle")
+@router.post("/api/proxy-pool/{proxy_id}/toggle", response_model=ProxyToggleResponse)
 async def toggle_proxy_in_pool(
     proxy_id: int,
     token: str = Depends(verify_admin_token)
 ):
     """Toggle proxy enabled status"""
     try:
-        proxies = await proxy_manager.get_all_pool_proxies()
-        proxy = next((p for p in proxies if p["id"] == proxy_id), None)
-        if not proxy:
+        # 原子 UPDATE ... RETURNING:单次往返,无 SELECT+UPDATE 竞争窗口
+        new_enabled = await proxy_manager.toggle_pool_proxy(proxy_id)
+        if new_enabled is None:
             raise HTTPException(status_code=404, detail="代理不存在")
-        
-        new_enabled = not proxy["enabled"]
-        await proxy_manager.update_pool_proxy(proxy_id, enabled=new_enabled)
-        return {
-            "success": True,
-            "message": f"代理已{'启用' if new_enabled else '禁用'}",
-            "enabled": new_enabled
-        }
+        _bump_proxy_pool_version()
+        return ProxyToggleResponse(
+            message=f"代理已{'启用' if new_enabled else '禁用'}",
+            enabled=new_enabled
+        )
     except HTTPException:
         raise
     except Exception as e:
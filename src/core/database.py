@@ -1,11 +1,369 @@
 """Database storage layer for Flow2API"""
 import aiosqlite
-import json
-from datetime import datetime
-from typing import Optional, List
+import logging
+import asyncio
+import orjson
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, date
+from typing import Callable, Optional, List
 from pathlib import Path
+from .config import config
 from .models import Token, TokenStats, Task, RequestLog, AdminConfig, ProxyConfig, GenerationConfig, CacheConfig, Project, CaptchaConfig, PluginConfig
 
+logger = logging.getLogger(__name__)
+
+# 连接级性能 PRAGMA:WAL 降低 fsync 频率,NORMAL 在 WAL 下依然崩溃安全
+def _token_insert_params(token: Token) -> tuple:
+    """tokens 表 INSERT 的参数元组 (与列顺序一致)"""
+    return (token.st, token.at, token.at_expires, token.email, token.name, token.remark,
+            token.is_active, token.credits, token.user_paygate_tier,
+            token.current_project_id, token.current_project_name,
+            token.image_enabled, token.video_enabled,
+            token.image_concurrency, token.video_concurrency)
+
+
+# 当前 schema 版本,写入 PRAGMA user_version。
+# 已迁移到该版本的库在启动时只读一个整数就能跳过全部表/列扫描;
+# 改动 schema(新表/新列/新索引)时必须 +1。
+CURRENT_SCHEMA_VERSION = 6  # v2: 外键/热路径索引; v3: request_logs 复合索引; v4: projects/tokens 复合索引; v5/v6: token/proxy_pool 部分索引
+
+# 请求日志合批:来第一条后最多等这么久、攒到这么多条就落一次盘
+_LOG_FLUSH_INTERVAL = 0.1
+_LOG_FLUSH_BATCH = 500
+# 代理使用统计合并落盘的间隔(秒)
+_PROXY_USAGE_FLUSH_INTERVAL = 1.0
+
+# kwargs 驱动的 UPDATE 改为固定 COALESCE 语句:参数为 None 表示"不修改",
+# 每张表只有一条语句进预编译缓存,也杜绝用列名拼 SQL
+_TOKEN_UPDATE_COLS = (
+    "st", "at", "at_expires", "email", "name", "remark", "is_active",
+    "last_used_at", "use_count", "credits", "user_paygate_tier",
+    "current_project_id", "current_project_name",
+    "image_enabled", "video_enabled", "image_concurrency", "video_concurrency",
+    "ban_reason", "banned_at",
+)
+_TOKEN_UPDATE_SQL = (
+    "UPDATE tokens SET "
+    + ", ".join(f"{c} = COALESCE(?, {c})" for c in _TOKEN_UPDATE_COLS)
+    + " WHERE id = ?"
+)
+
+_TASK_UPDATE_COLS = ("status", "progress", "result_urls", "error_message", "scene_id", "completed_at")
+_TASK_UPDATE_SQL = (
+    "UPDATE tasks SET "
+    + ", ".join(f"{c} = COALESCE(?, {c})" for c in _TASK_UPDATE_COLS)
+    + " WHERE task_id = ?"
+)
+
+_ADMIN_UPDATE_COLS = ("username", "password", "api_key", "error_ban_threshold")
+_ADMIN_UPDATE_SQL = (
+    "UPDATE admin_config SET "
+    + ", ".join(f"{c} = COALESCE(?, {c})" for c in _ADMIN_UPDATE_COLS)
+    + ", updated_at = CURRENT_TIMESTAMP WHERE id = 1"
+)
+
+_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    # 外部工具(如 sqlite3 CLI)持锁时等 5s 再报 SQLITE_BUSY
+    "PRAGMA busy_timeout=5000",
+    # mmap 直接走 OS 页缓存,省掉 pager 每页一次 memcpy;
+    # 平台不支持时自动退回普通 I/O,纯增益
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA foreign_keys=ON",
+)
+
+
+# init_db 的全部建表/建索引 DDL。拼成一个脚本用 executescript 一次执行,
+# 把十几次跨线程的 execute 往返压缩成一次
+_INIT_DDL = """
+-- Tokens table (Flow2API版本)
+CREATE TABLE IF NOT EXISTS tokens (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    st TEXT UNIQUE NOT NULL,
+    at TEXT,
+    at_expires TIMESTAMP,
+    email TEXT NOT NULL,
+    name TEXT,
+    remark TEXT,
+    is_active BOOLEAN DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_used_at TIMESTAMP,
+    use_count INTEGER DEFAULT 0,
+    credits INTEGER DEFAULT 0,
+    user_paygate_tier TEXT,
+    current_project_id TEXT,
+    current_project_name TEXT,
+    image_enabled BOOLEAN DEFAULT 1,
+    video_enabled BOOLEAN DEFAULT 1,
+    image_concurrency INTEGER DEFAULT -1,
+    video_concurrency INTEGER DEFAULT -1,
+    ban_reason TEXT,
+    banned_at TIMESTAMP
+);
+
+-- Projects table
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_id TEXT UNIQUE NOT NULL,
+    token_id INTEGER NOT NULL,
+    project_name TEXT NOT NULL,
+    tool_name TEXT DEFAULT 'PINHOLE',
+    is_active BOOLEAN DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (token_id) REFERENCES tokens(id) ON DELETE CASCADE
+);
+
+-- Token stats table
+CREATE TABLE IF NOT EXISTS token_stats (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    token_id INTEGER NOT NULL,
+    image_count INTEGER DEFAULT 0,
+    video_count INTEGER DEFAULT 0,
+    success_count INTEGER DEFAULT 0,
+    error_count INTEGER DEFAULT 0,
+    last_success_at TIMESTAMP,
+    last_error_at TIMESTAMP,
+    today_image_count INTEGER DEFAULT 0,
+    today_video_count INTEGER DEFAULT 0,
+    today_error_count INTEGER DEFAULT 0,
+    today_date DATE,
+    consecutive_error_count INTEGER DEFAULT 0,
+    FOREIGN KEY (token_id) REFERENCES tokens(id) ON DELETE CASCADE
+);
+
+-- Tasks table
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT UNIQUE NOT NULL,
+    token_id INTEGER NOT NULL,
+    model TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'processing',
+    progress INTEGER DEFAULT 0,
+    result_urls TEXT,
+    error_message TEXT,
+    scene_id TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP,
+    FOREIGN KEY (token_id) REFERENCES tokens(id) ON DELETE CASCADE
+);
+
+-- Request logs table
+CREATE TABLE IF NOT EXISTS request_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    token_id INTEGER,
+    operation TEXT NOT NULL,
+    request_body TEXT,
+    response_body TEXT,
+    status_code INTEGER NOT NULL,
+    duration FLOAT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (token_id) REFERENCES tokens(id) ON DELETE SET NULL
+);
+
+-- Admin config table
+CREATE TABLE IF NOT EXISTS admin_config (
+    id INTEGER PRIMARY KEY DEFAULT 1,
+    username TEXT DEFAULT 'admin',
+    password TEXT DEFAULT 'admin',
+    api_key TEXT DEFAULT 'han1234',
+    error_ban_threshold INTEGER DEFAULT 3,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Proxy config table
+CREATE TABLE IF NOT EXISTS proxy_config (
+    id INTEGER PRIMARY KEY DEFAULT 1,
+    enabled BOOLEAN DEFAULT 0,
+    proxy_url TEXT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Generation config table
+CREATE TABLE IF NOT EXISTS generation_config (
+    id INTEGER PRIMARY KEY DEFAULT 1,
+    image_timeout INTEGER DEFAULT 300,
+    video_timeout INTEGER DEFAULT 1500,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Cache config table
+CREATE TABLE IF NOT EXISTS cache_config (
+    id INTEGER PRIMARY KEY DEFAULT 1,
+    cache_enabled BOOLEAN DEFAULT 0,
+    cache_timeout INTEGER DEFAULT 7200,
+    cache_base_url TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Debug config table
+CREATE TABLE IF NOT EXISTS debug_config (
+    id INTEGER PRIMARY KEY DEFAULT 1,
+    enabled BOOLEAN DEFAULT 0,
+    log_requests BOOLEAN DEFAULT 1,
+    log_responses BOOLEAN DEFAULT 1,
+    mask_token BOOLEAN DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Captcha config table
+CREATE TABLE IF NOT EXISTS captcha_config (
+    id INTEGER PRIMARY KEY DEFAULT 1,
+    captcha_method TEXT DEFAULT 'browser',
+    yescaptcha_api_key TEXT DEFAULT '',
+    yescaptcha_base_url TEXT DEFAULT 'https://api.yescaptcha.com',
+    website_key TEXT DEFAULT '6LdsFiUsAAAAAIjVDZcuLhaHiDn5nnHVXVRQGeMV',
+    page_action TEXT DEFAULT 'FLOW_GENERATION',
+    browser_proxy_enabled BOOLEAN DEFAULT 0,
+    browser_proxy_url TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Plugin config table
+CREATE TABLE IF NOT EXISTS plugin_config (
+    id INTEGER PRIMARY KEY DEFAULT 1,
+    connection_token TEXT DEFAULT '',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Proxy pool table
+CREATE TABLE IF NOT EXISTS proxy_pool (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    proxy_url TEXT NOT NULL,
+    name TEXT,
+    enabled BOOLEAN DEFAULT 1,
+    success_count INTEGER DEFAULT 0,
+    fail_count INTEGER DEFAULT 0,
+    last_used_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Proxy pool config table
+CREATE TABLE IF NOT EXISTS proxy_pool_config (
+    id INTEGER PRIMARY KEY DEFAULT 1,
+    pool_enabled BOOLEAN DEFAULT 0,
+    rotation_mode TEXT DEFAULT 'round_robin',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+"""
+
+# 索引单独建:等 _migrate_request_logs 的批量复制结束后再执行,
+# 免得复制期间每行都要维护 B-tree(建完表先灌数据,最后建索引)
+_INIT_INDEX_DDL = """
+CREATE INDEX IF NOT EXISTS idx_task_id ON tasks(task_id);
+CREATE INDEX IF NOT EXISTS idx_token_st ON tokens(st);
+CREATE INDEX IF NOT EXISTS idx_project_id ON projects(project_id);
+CREATE INDEX IF NOT EXISTS idx_token_stats_token_id ON token_stats(token_id);
+CREATE INDEX IF NOT EXISTS idx_tasks_token_id ON tasks(token_id);
+CREATE INDEX IF NOT EXISTS idx_request_logs_token_created ON request_logs(token_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_request_logs_created_at ON request_logs(created_at);
+CREATE INDEX IF NOT EXISTS idx_projects_token_created ON projects(token_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_tokens_active ON tokens(is_active, banned_at);
+CREATE INDEX IF NOT EXISTS idx_tokens_active_lastused ON tokens(last_used_at) WHERE is_active = 1;
+CREATE INDEX IF NOT EXISTS idx_proxy_enabled_used ON proxy_pool(last_used_at) WHERE enabled = 1;
+"""
+
+# 升级用的补列 DDL,按 (表, 列, 常量语句) 列出。
+# 语句全是字面量,SQLite 的 prepare 缓存可以命中,不在运行时拼 f-string。
+#
+# 注意:这条路径只适合"加可空/带默认值的列"。要改列类型、删列或
+# 加 NOT NULL 约束时,应改用 SQLite 官方的 12 步重建表流程
+# (CREATE tokens_new → INSERT SELECT → DROP → RENAME,放在
+# user_version 分段的单个事务里),不要往这张表里硬塞
+_COLUMN_MIGRATIONS = (
+    # tokens
+    ("tokens", "at", "ALTER TABLE tokens ADD COLUMN at TEXT"),  # Access Token
+    ("tokens", "at_expires", "ALTER TABLE tokens ADD COLUMN at_expires TIMESTAMP"),
+    ("tokens", "credits", "ALTER TABLE tokens ADD COLUMN credits INTEGER DEFAULT 0"),
+    ("tokens", "user_paygate_tier", "ALTER TABLE tokens ADD COLUMN user_paygate_tier TEXT"),
+    ("tokens", "current_project_id", "ALTER TABLE tokens ADD COLUMN current_project_id TEXT"),
+    ("tokens", "current_project_name", "ALTER TABLE tokens ADD COLUMN current_project_name TEXT"),
+    ("tokens", "image_enabled", "ALTER TABLE tokens ADD COLUMN image_enabled BOOLEAN DEFAULT 1"),
+    ("tokens", "video_enabled", "ALTER TABLE tokens ADD COLUMN video_enabled BOOLEAN DEFAULT 1"),
+    ("tokens", "image_concurrency", "ALTER TABLE tokens ADD COLUMN image_concurrency INTEGER DEFAULT -1"),
+    ("tokens", "video_concurrency", "ALTER TABLE tokens ADD COLUMN video_concurrency INTEGER DEFAULT -1"),
+    ("tokens", "ban_reason", "ALTER TABLE tokens ADD COLUMN ban_reason TEXT"),  # 禁用原因
+    ("tokens", "banned_at", "ALTER TABLE tokens ADD COLUMN banned_at TIMESTAMP"),  # 禁用时间
+    # admin_config
+    ("admin_config", "error_ban_threshold", "ALTER TABLE admin_config ADD COLUMN error_ban_threshold INTEGER DEFAULT 3"),
+    # captcha_config
+    ("captcha_config", "browser_proxy_enabled", "ALTER TABLE captcha_config ADD COLUMN browser_proxy_enabled BOOLEAN DEFAULT 0"),
+    ("captcha_config", "browser_proxy_url", "ALTER TABLE captcha_config ADD COLUMN browser_proxy_url TEXT"),
+    # token_stats
+    ("token_stats", "today_image_count", "ALTER TABLE token_stats ADD COLUMN today_image_count INTEGER DEFAULT 0"),
+    ("token_stats", "today_video_count", "ALTER TABLE token_stats ADD COLUMN today_video_count INTEGER DEFAULT 0"),
+    ("token_stats", "today_error_count", "ALTER TABLE token_stats ADD COLUMN today_error_count INTEGER DEFAULT 0"),
+    ("token_stats", "today_date", "ALTER TABLE token_stats ADD COLUMN today_date DATE"),
+    ("token_stats", "consecutive_error_count", "ALTER TABLE token_stats ADD COLUMN consecutive_error_count INTEGER DEFAULT 0"),  # 连续错误计数
+    # plugin_config
+    ("plugin_config", "auto_enable_on_update", "ALTER TABLE plugin_config ADD COLUMN auto_enable_on_update BOOLEAN DEFAULT 1"),  # 默认开启
+)
+
+
+# 各单行配置表的默认行:(INSERT OR IGNORE 语句, 字段元组)。
+# 字段为 (TOML 节, 键, 默认值, 空串是否落为 NULL),在 import 时算好,
+# _ensure_config_rows 只需逐字段取值
+_CONFIG_ROW_SEEDS = (
+    ("""
+        INSERT OR IGNORE INTO admin_config (id, username, password, api_key, error_ban_threshold)
+        VALUES (1, ?, ?, ?, ?)
+    """, (
+        ("global", "admin_username", "admin", False),
+        ("global", "admin_password", "admin", False),
+        ("global", "api_key", "han1234", False),
+        ("admin", "error_ban_threshold", 3, False),
+    )),
+    ("""
+        INSERT OR IGNORE INTO proxy_config (id, enabled, proxy_url)
+        VALUES (1, ?, ?)
+    """, (
+        ("proxy", "proxy_enabled", False, False),
+        ("proxy", "proxy_url", None, True),
+    )),
+    ("""
+        INSERT OR IGNORE INTO generation_config (id, image_timeout, video_timeout)
+        VALUES (1, ?, ?)
+    """, (
+        ("generation", "image_timeout", 300, False),
+        ("generation", "video_timeout", 1500, False),
+    )),
+    ("""
+        INSERT OR IGNORE INTO cache_config (id, cache_enabled, cache_timeout, cache_base_url)
+        VALUES (1, ?, ?, ?)
+    """, (
+        ("cache", "enabled", False, False),
+        ("cache", "timeout", 7200, False),
+        ("cache", "base_url", None, True),
+    )),
+    ("""
+        INSERT OR IGNORE INTO debug_config (id, enabled, log_requests, log_responses, mask_token)
+        VALUES (1, ?, ?, ?, ?)
+    """, (
+        ("debug", "enabled", False, False),
+        ("debug", "log_requests", True, False),
+        ("debug", "log_responses", True, False),
+        ("debug", "mask_token", True, False),
+    )),
+    ("""
+        INSERT OR IGNORE INTO captcha_config (id, captcha_method, yescaptcha_api_key, yescaptcha_base_url)
+        VALUES (1, ?, ?, ?)
+    """, (
+        ("captcha", "captcha_method", "browser", False),
+        ("captcha", "yescaptcha_api_key", "", False),
+        ("captcha", "yescaptcha_base_url", "https://api.yescaptcha.com", False),
+    )),
+)
+
+
 
 class Database:
     """SQLite database manager"""
@@ -17,11 +375,105 @@ class Database:
             data_dir.mkdir(exist_ok=True)
             db_path = str(data_dir / "flow.db")
         self.db_path = db_path
+        # In-memory cache for single-row config tables: these are read on
+        # hot paths but only change via the corresponding update_* methods,
+        # which invalidate the cached entry.
+        self._config_cache = {}
+        # Token 列表同理:负载均衡/管理页每次请求都读,单进程内所有写都
+        # 经过下面的 token 写方法,写后整体清掉即可保证一致
+        self._token_list_cache = {}
+        # 当天日期串最多每秒重算一次:三个 increment_* 每次请求都要绑定它
+        self._today_cache = (0.0, "")
+        # 长连接:避免每次调用重开连接(重放 PRAGMA、重建页缓存)
+        self._db: Optional[aiosqlite.Connection] = None
+        self._db_lock = None  # lazily created so it binds to the running loop
+        # 请求日志合批队列(首次 add_request_log 时惰性创建,绑定运行中的 loop)
+        self._log_queue: Optional[asyncio.Queue] = None
+        self._log_flusher_task: Optional[asyncio.Task] = None
+        # 周期性 PRAGMA optimize:长跑进程里让查询计划统计保持新鲜
+        self._optimize_task: Optional[asyncio.Task] = None
+        # 代理使用计数先在内存里合并,后台协程按秒落盘
+        self._proxy_usage_buffer = {}
+        self._proxy_usage_task: Optional[asyncio.Task] = None
+        # 使用计数落盘后的回调:API 层挂上它来推进 ETag 版本号,
+        # 否则 success/fail 计数变了,条件 GET 还在命中 304
+        self.on_proxy_usage_flushed: Optional[Callable[[], None]] = None
 
     def db_exists(self) -> bool:
         """Check if database file exists"""
         return Path(self.db_path).exists()
 
+    async def connect(self) -> aiosqlite.Connection:
+        """Open (once) and return the shared connection with PRAGMAs applied"""
+        if self._db is None:
+            # cached_statements 放大 sqlite3 的预编译语句缓存(默认 128):
+            # 本模块的 SQL 都是字面量常量,同一语句跨调用直接复用编译结果
+            db = await aiosqlite.connect(self.db_path, cached_statements=256)
+            db.row_factory = aiosqlite.Row  # 统一设一次,各方法不再逐调用赋值
+            for pragma in _CONNECTION_PRAGMAS:
+                await db.execute(pragma)
+            self._db = db
+            if self._optimize_task is None:
+                self._optimize_task = asyncio.create_task(self._optimize_loop())
+        return self._db
+
+    async def _optimize_loop(self):
+        """每 15 分钟跑一次 PRAGMA optimize (SQLite 官方对长跑进程的建议)"""
+        while True:
+            await asyncio.sleep(900)
+            try:
+                async with self._connect() as db:
+                    await db.execute("PRAGMA optimize")
+            except Exception as e:
+                logger.warning("PRAGMA optimize 执行失败: %s", e)
+
+    async def close(self):
+        """Close the shared connection (application shutdown)"""
+        if self._optimize_task is not None:
+            self._optimize_task.cancel()
+            try:
+                await self._optimize_task
+            except asyncio.CancelledError:
+                pass
+            self._optimize_task = None
+        if self._proxy_usage_task is not None:
+            self._proxy_usage_task.cancel()
+            try:
+                await self._proxy_usage_task
+            except asyncio.CancelledError:
+                pass
+            self._proxy_usage_task = None
+        if self._log_flusher_task is not None:
+            self._log_flusher_task.cancel()
+            try:
+                await self._log_flusher_task
+            except asyncio.CancelledError:
+                pass
+            self._log_flusher_task = None
+        # 冲掉队列里还没落盘的日志
+        if self._log_queue is not None:
+            pending = self._drain_log_queue()
+            if pending:
+                await self._flush_logs(pending)
+            self._log_queue = None
+        if self._db is not None:
+            # 刷新 sqlite_stat1,下次启动查询计划器有新鲜统计可用
+            await self._db.execute("PRAGMA optimize")
+            await self._db.close()
+            self._db = None
+
+    @asynccontextmanager
+    async def _connect(self):
+        """Yield the shared connection
+
+        锁把"语句+commit"整体串行化,避免并发任务的事务语句交错;
+        SQLite 本来就是单写者,吞吐上没有额外损失。
+        """
+        if self._db_lock is None:
+            self._db_lock = asyncio.Lock()
+        async with self._db_lock:
+            yield await self.connect()
+
     async def _table_exists(self, db, table_name: str) -> bool:
         """Check if a table exists in the database"""
         cursor = await db.execute(
@@ -31,14 +483,28 @@ class Database:
         result = await cursor.fetchone()
         return result is not None
 
+    async def _snapshot_schema(self, db) -> tuple:
+        """一次性抓取 schema 快照: (表名集合, 表名->列名集合)
+
+        迁移检查改为对快照做 in 测试,把 O(表数*列数) 次 PRAGMA
+        round-trip 压到每表一次。
+        """
+        cursor = await db.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        tables = {row[0] for row in await cursor.fetchall()}
+        columns = {}
+        for table in tables:
+            cursor = await db.execute(f"PRAGMA table_info({table})")
+            columns[table] = {row[1] for row in await cursor.fetchall()}
+        return tables, columns
+
     async def _column_exists(self, db, table_name: str, column_name: str) -> bool:
-        """Check if a column exists in a table"""
-        try:
-            cursor = await db.execute(f"PRAGMA table_info({table_name})")
-            columns = await cursor.fetchall()
-            return any(col[1] == column_name for col in columns)
-        except:
-            return False
+        """Check if a column exists in a table (table_name 仅来自代码内常量)"""
+        # 流式遍历游标,命中即返回,不把整个 PRAGMA 结果物化成 list
+        cursor = await db.execute(f"PRAGMA table_info({table_name})")
+        async for row in cursor:
+            if row[1] == column_name:
+                return True
+        return False
 
     async def _ensure_config_rows(self, db, config_dict: dict = None):
         """Ensure all config tables have their default rows
@@ -48,133 +514,24 @@ class Database:
             config_dict: Configuration dictionary from setting.toml (optional)
                         If None, use default values instead of reading from TOML.
         """
-        # Ensure admin_config has a row
-        cursor = await db.execute("SELECT COUNT(*) FROM admin_config")
-        count = await cursor.fetchone()
-        if count[0] == 0:
-            admin_username = "admin"
-            admin_password = "admin"
-            api_key = "han1234"
-            error_ban_threshold = 3
-
-            if config_dict:
-                global_config = config_dict.get("global", {})
-                admin_username = global_config.get("admin_username", "admin")
-                admin_password = global_config.get("admin_password", "admin")
-                api_key = global_config.get("api_key", "han1234")
-
-                admin_config = config_dict.get("admin", {})
-                error_ban_threshold = admin_config.get("error_ban_threshold", 3)
-
-            await db.execute("""
-                INSERT INTO admin_config (id, username, password, api_key, error_ban_threshold)
-                VALUES (1, ?, ?, ?, ?)
-            """, (admin_username, admin_password, api_key, error_ban_threshold))
-
-        # Ensure proxy_config has a row
-        cursor = await db.execute("SELECT COUNT(*) FROM proxy_config")
-        count = await cursor.fetchone()
-        if count[0] == 0:
-            proxy_enabled = False
-            proxy_url = None
-
-            if config_dict:
-                proxy_config = config_dict.get("proxy", {})
-                proxy_enabled = proxy_config.get("proxy_enabled", False)
-                proxy_url = proxy_config.get("proxy_url", "")
-                proxy_url = proxy_url if proxy_url else None
-
-            await db.execute("""
-                INSERT INTO proxy_config (id, enabled, proxy_url)
-                VALUES (1, ?, ?)
-            """, (proxy_enabled, proxy_url))
-
-        # Ensure generation_config has a row
-        cursor = await db.execute("SELECT COUNT(*) FROM generation_config")
-        count = await cursor.fetchone()
-        if count[0] == 0:
-            image_timeout = 300
-            video_timeout = 1500
-
-            if config_dict:
-                generation_config = config_dict.get("generation", {})
-                image_timeout = generation_config.get("image_timeout", 300)
-                video_timeout = generation_config.get("video_timeout", 1500)
-
-            await db.execute("""
-                INSERT INTO generation_config (id, image_timeout, video_timeout)
-                VALUES (1, ?, ?)
-            """, (image_timeout, video_timeout))
-
-        # Ensure cache_config has a row
-        cursor = await db.execute("SELECT COUNT(*) FROM cache_config")
-        count = await cursor.fetchone()
-        if count[0] == 0:
-            cache_enabled = False
-            cache_timeout = 7200
-            cache_base_url = None
-
-            if config_dict:
-                cache_config = config_dict.get("cache", {})
-                cache_enabled = cache_config.get("enabled", False)
-                cache_timeout = cache_config.get("timeout", 7200)
-                cache_base_url = cache_config.get("base_url", "")
-                # Convert empty string to None
-                cache_base_url = cache_base_url if cache_base_url else None
-
-            await db.execute("""
-                INSERT INTO cache_config (id, cache_enabled, cache_timeout, cache_base_url)
-                VALUES (1, ?, ?, ?)
-            """, (cache_enabled, cache_timeout, cache_base_url))
-
-        # Ensure debug_config has a row
-        cursor = await db.execute("SELECT COUNT(*) FROM debug_config")
-        count = await cursor.fetchone()
-        if count[0] == 0:
-            debug_enabled = False
-            log_requests = True
-            log_responses = True
-            mask_token = True
-
-            if config_dict:
-                debug_config = config_dict.get("debug", {})
-                debug_enabled = debug_config.get("enabled", False)
-                log_requests = debug_config.get("log_requests", True)
-                log_responses = debug_config.get("log_responses", True)
-                mask_token = debug_config.get("mask_token", True)
-
-            await db.execute("""
-                INSERT INTO debug_config (id, enabled, log_requests, log_responses, mask_token)
-                VALUES (1, ?, ?, ?, ?)
-            """, (debug_enabled, log_requests, log_responses, mask_token))
-
-        # Ensure captcha_config has a row
-        cursor = await db.execute("SELECT COUNT(*) FROM captcha_config")
-        count = await cursor.fetchone()
-        if count[0] == 0:
-            captcha_method = "browser"
-            yescaptcha_api_key = ""
-            yescaptcha_base_url = "https://api.yescaptcha.com"
-
-            if config_dict:
-                captcha_config = config_dict.get("captcha", {})
-                captcha_method = captcha_config.get("captcha_method", "browser")
-                yescaptcha_api_key = captcha_config.get("yescaptcha_api_key", "")
-                yescaptcha_base_url = captcha_config.get("yescaptcha_base_url", "https://api.yescaptcha.com")
-
-            await db.execute("""
-                INSERT INTO captcha_config (id, captcha_method, yescaptcha_api_key, yescaptcha_base_url)
-                VALUES (1, ?, ?, ?)
-            """, (captcha_method, yescaptcha_api_key, yescaptcha_base_url))
-
-        # Ensure plugin_config has a row
-        cursor = await db.execute("SELECT COUNT(*) FROM plugin_config")
-        count = await cursor.fetchone()
-        if count[0] == 0:
-            await db.execute("""
-                INSERT INTO plugin_config (id, connection_token)
-                VALUES (1, '')
-            """)
+        # 每表一条 INSERT OR IGNORE:已有行时主键冲突直接忽略,
+        # 省掉先 COUNT(*) 再 INSERT 的读写两跳。
+        # 字段默认值在 _CONFIG_ROW_SEEDS 常量里,这里只做 TOML 覆盖
+        for sql, fields in _CONFIG_ROW_SEEDS:
+            params = []
+            for section, key, default, empty_as_none in fields:
+                value = default
+                if config_dict:
+                    value = config_dict.get(section, {}).get(key, default)
+                if empty_as_none and not value:
+                    value = None
+                params.append(value)
+            await db.execute(sql, tuple(params))
+
+        await db.execute("""
+            INSERT OR IGNORE INTO plugin_config (id, connection_token)
+            VALUES (1, '')
+        """)
 
     async def check_and_migrate_db(self, config_dict: dict = None):
         """Check database integrity and perform migrations if needed
@@ -189,13 +546,26 @@ class Database:
                         Used only to initialize missing config rows with default values.
                         Existing config rows will NOT be overwritten.
         """
-        async with aiosqlite.connect(self.db_path) as db:
-            print("Checking database integrity and performing migrations...")
+        async with self._connect() as db:
+            # 已是最新 schema 时用一次整数比较短路整个迁移检查
+            cursor = await db.execute("PRAGMA user_version")
+            user_version = (await cursor.fetchone())[0]
+            if user_version >= CURRENT_SCHEMA_VERSION:
+                return
+
+            logger.info("Checking database integrity and performing migrations...")
+
+            # 一次快照代替逐列 PRAGMA 查询
+            tables, columns = await self._snapshot_schema(db)
+
+            # DDL 默认逐条自动提交;显式事务让全部 schema 变更只落盘一次
+            await db.execute("BEGIN IMMEDIATE")
+            created_any = False
 
             # ========== Step 1: Create missing tables ==========
             # Check and create cache_config table if missing
-            if not await self._table_exists(db, "cache_config"):
-                print("  ✓ Creating missing table: cache_config")
+            if "cache_config" not in tables:
+                logger.info("  ✓ Creating missing table: cache_config")
                 await db.execute("""
                     CREATE TABLE cache_config (
                         id INTEGER PRIMARY KEY DEFAULT 1,
@@ -206,10 +576,11 @@ class Database:
                         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
                 """)
+                created_any = True
 
             # Check and create captcha_config table if missing
-            if not await self._table_exists(db, "captcha_config"):
-                print("  ✓ Creating missing table: captcha_config")
+            if "captcha_config" not in tables:
+                logger.info("  ✓ Creating missing table: captcha_config")
                 await db.execute("""
                     CREATE TABLE captcha_config (
                         id INTEGER PRIMARY KEY DEFAULT 1,
@@ -224,10 +595,11 @@ class Database:
                         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
                 """)
+                created_any = True
 
             # Check and create plugin_config table if missing
-            if not await self._table_exists(db, "plugin_config"):
-                print("  ✓ Creating missing table: plugin_config")
+            if "plugin_config" not in tables:
+                logger.info("  ✓ Creating missing table: plugin_config")
                 await db.execute("""
                     CREATE TABLE plugin_config (
                         id INTEGER PRIMARY KEY DEFAULT 1,
@@ -236,10 +608,11 @@ class Database:
                         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
                 """)
+                created_any = True
 
             # Check and create proxy_pool table if missing
-            if not await self._table_exists(db, "proxy_pool"):
-                print("  ✓ Creating missing table: proxy_pool")
+            if "proxy_pool" not in tables:
+                logger.info("  ✓ Creating missing table: proxy_pool")
                 await db.execute("""
                     CREATE TABLE proxy_pool (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -252,10 +625,11 @@ class Database:
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
                 """)
+                created_any = True
 
             # Check and create proxy_pool_config table if missing
-            if not await self._table_exists(db, "proxy_pool_config"):
-                print("  ✓ Creating missing table: proxy_pool_config")
+            if "proxy_pool_config" not in tables:
+                logger.info("  ✓ Creating missing table: proxy_pool_config")
                 await db.execute("""
                     CREATE TABLE proxy_pool_config (
                         id INTEGER PRIMARY KEY DEFAULT 1,
@@ -264,310 +638,89 @@ class Database:
                         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
                 """)
+                created_any = True
+
+            # 新建过表则重拍一次快照,让 Step 2 看到它们的列
+            if created_any:
+                tables, columns = await self._snapshot_schema(db)
 
             # ========== Step 2: Add missing columns to existing tables ==========
-            # Check and add missing columns to tokens table
-            if await self._table_exists(db, "tokens"):
-                columns_to_add = [
-                    ("at", "TEXT"),  # Access Token
-                    ("at_expires", "TIMESTAMP"),  # AT expiration time
-                    ("credits", "INTEGER DEFAULT 0"),  # Balance
-                    ("user_paygate_tier", "TEXT"),  # User tier
-                    ("current_project_id", "TEXT"),  # Current project UUID
-                    ("current_project_name", "TEXT"),  # Project name
-                    ("image_enabled", "BOOLEAN DEFAULT 1"),
-                    ("video_enabled", "BOOLEAN DEFAULT 1"),
-                    ("image_concurrency", "INTEGER DEFAULT -1"),
-                    ("video_concurrency", "INTEGER DEFAULT -1"),
-                    ("ban_reason", "TEXT"),  # 禁用原因
-                    ("banned_at", "TIMESTAMP"),  # 禁用时间
-                ]
-
-                for col_name, col_type in columns_to_add:
-                    if not await self._column_exists(db, "tokens", col_name):
-                        try:
-                            await db.execute(f"ALTER TABLE tokens ADD COLUMN {col_name} {col_type}")
-                            print(f"  ✓ Added column '{col_name}' to tokens table")
-                        except Exception as e:
-                            print(f"  ✗ Failed to add column '{col_name}': {e}")
-
-            # Check and add missing columns to admin_config table
-            if await self._table_exists(db, "admin_config"):
-                if not await self._column_exists(db, "admin_config", "error_ban_threshold"):
-                    try:
-                        await db.execute("ALTER TABLE admin_config ADD COLUMN error_ban_threshold INTEGER DEFAULT 3")
-                        print("  ✓ Added column 'error_ban_threshold' to admin_config table")
-                    except Exception as e:
-                        print(f"  ✗ Failed to add column 'error_ban_threshold': {e}")
-
-            # Check and add missing columns to captcha_config table
-            if await self._table_exists(db, "captcha_config"):
-                captcha_columns_to_add = [
-                    ("browser_proxy_enabled", "BOOLEAN DEFAULT 0"),
-                    ("browser_proxy_url", "TEXT"),
-                ]
-
-                for col_name, col_type in captcha_columns_to_add:
-                    if not await self._column_exists(db, "captcha_config", col_name):
-                        try:
-                            await db.execute(f"ALTER TABLE captcha_config ADD COLUMN {col_name} {col_type}")
-                            print(f"  ✓ Added column '{col_name}' to captcha_config table")
-                        except Exception as e:
-                            print(f"  ✗ Failed to add column '{col_name}': {e}")
-
-            # Check and add missing columns to token_stats table
-            if await self._table_exists(db, "token_stats"):
-                stats_columns_to_add = [
-                    ("today_image_count", "INTEGER DEFAULT 0"),
-                    ("today_video_count", "INTEGER DEFAULT 0"),
-                    ("today_error_count", "INTEGER DEFAULT 0"),
-                    ("today_date", "DATE"),
-                    ("consecutive_error_count", "INTEGER DEFAULT 0"),  # 🆕 连续错误计数
-                ]
-
-                for col_name, col_type in stats_columns_to_add:
-                    if not await self._column_exists(db, "token_stats", col_name):
-                        try:
-                            await db.execute(f"ALTER TABLE token_stats ADD COLUMN {col_name} {col_type}")
-                            print(f"  ✓ Added column '{col_name}' to token_stats table")
-                        except Exception as e:
-                            print(f"  ✗ Failed to add column '{col_name}': {e}")
-
-            # Check and add missing columns to plugin_config table
-            if await self._table_exists(db, "plugin_config"):
-                plugin_columns_to_add = [
-                    ("auto_enable_on_update", "BOOLEAN DEFAULT 1"),  # 默认开启
-                ]
-
-                for col_name, col_type in plugin_columns_to_add:
-                    if not await self._column_exists(db, "plugin_config", col_name):
-                        try:
-                            await db.execute(f"ALTER TABLE plugin_config ADD COLUMN {col_name} {col_type}")
-                            print(f"  ✓ Added column '{col_name}' to plugin_config table")
-                        except Exception as e:
-                            print(f"  ✗ Failed to add column '{col_name}': {e}")
+            for table_name, col_name, ddl in _COLUMN_MIGRATIONS:
+                if table_name not in tables:
+                    continue
+                existing = columns.setdefault(table_name, set())
+                if col_name in existing:
+                    continue
+                try:
+                    await db.execute(ddl)
+                    existing.add(col_name)
+                    logger.info("  ✓ Added column '%s' to %s table", col_name, table_name)
+                except Exception as e:
+                    logger.warning("  ✗ Failed to add column '%s': %s", col_name, e)
 
             # ========== Step 3: Ensure all config tables have default rows ==========
             # Note: This will NOT overwrite existing config rows
             # It only ensures missing rows are created with default values from setting.toml
             await self._ensure_config_rows(db, config_dict=config_dict)
 
-            await db.commit()
-            print("Database migration check completed.")
-
-    async def init_db(self):
-        """Initialize database tables"""
-        async with aiosqlite.connect(self.db_path) as db:
-            # Tokens table (Flow2API版本)
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS tokens (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    st TEXT UNIQUE NOT NULL,
-                    at TEXT,
-                    at_expires TIMESTAMP,
-                    email TEXT NOT NULL,
-                    name TEXT,
-                    remark TEXT,
-                    is_active BOOLEAN DEFAULT 1,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_used_at TIMESTAMP,
-                    use_count INTEGER DEFAULT 0,
-                    credits INTEGER DEFAULT 0,
-                    user_paygate_tier TEXT,
-                    current_project_id TEXT,
-                    current_project_name TEXT,
-                    image_enabled BOOLEAN DEFAULT 1,
-                    video_enabled BOOLEAN DEFAULT 1,
-                    image_concurrency INTEGER DEFAULT -1,
-                    video_concurrency INTEGER DEFAULT -1,
-                    ban_reason TEXT,
-                    banned_at TIMESTAMP
-                )
-            """)
-
-            # Projects table (新增)
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS projects (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    project_id TEXT UNIQUE NOT NULL,
-                    token_id INTEGER NOT NULL,
-                    project_name TEXT NOT NULL,
-                    tool_name TEXT DEFAULT 'PINHOLE',
-                    is_active BOOLEAN DEFAULT 1,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (token_id) REFERENCES tokens(id)
-                )
-            """)
-
-            # Token stats table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS token_stats (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    token_id INTEGER NOT NULL,
-                    image_count INTEGER DEFAULT 0,
-                    video_count INTEGER DEFAULT 0,
-                    success_count INTEGER DEFAULT 0,
-                    error_count INTEGER DEFAULT 0,
-                    last_success_at TIMESTAMP,
-                    last_error_at TIMESTAMP,
-                    today_image_count INTEGER DEFAULT 0,
-                    today_video_count INTEGER DEFAULT 0,
-                    today_error_count INTEGER DEFAULT 0,
-                    today_date DATE,
-                    consecutive_error_count INTEGER DEFAULT 0,
-                    FOREIGN KEY (token_id) REFERENCES tokens(id)
-                )
-            """)
-
-            # Tasks table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS tasks (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    task_id TEXT UNIQUE NOT NULL,
-                    token_id INTEGER NOT NULL,
-                    model TEXT NOT NULL,
-                    prompt TEXT NOT NULL,
-                    status TEXT NOT NULL DEFAULT 'processing',
-                    progress INTEGER DEFAULT 0,
-                    result_urls TEXT,
-                    error_message TEXT,
-                    scene_id TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    completed_at TIMESTAMP,
-                    FOREIGN KEY (token_id) REFERENCES tokens(id)
-                )
-            """)
-
-            # Request logs table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS request_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    token_id INTEGER,
-                    operation TEXT NOT NULL,
-                    request_body TEXT,
-                    response_body TEXT,
-                    status_code INTEGER NOT NULL,
-                    duration FLOAT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (token_id) REFERENCES tokens(id)
-                )
-            """)
-
-            # Admin config table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS admin_config (
-                    id INTEGER PRIMARY KEY DEFAULT 1,
-                    username TEXT DEFAULT 'admin',
-                    password TEXT DEFAULT 'admin',
-                    api_key TEXT DEFAULT 'han1234',
-                    error_ban_threshold INTEGER DEFAULT 3,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            # Proxy config table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS proxy_config (
-                    id INTEGER PRIMARY KEY DEFAULT 1,
-                    enabled BOOLEAN DEFAULT 0,
-                    proxy_url TEXT,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            # Generation config table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS generation_config (
-                    id INTEGER PRIMARY KEY DEFAULT 1,
-                    image_timeout INTEGER DEFAULT 300,
-                    video_timeout INTEGER DEFAULT 1500,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            # Cache config table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS cache_config (
-                    id INTEGER PRIMARY KEY DEFAULT 1,
-                    cache_enabled BOOLEAN DEFAULT 0,
-                    cache_timeout INTEGER DEFAULT 7200,
-                    cache_base_url TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            # Debug config table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS debug_config (
-                    id INTEGER PRIMARY KEY DEFAULT 1,
-                    enabled BOOLEAN DEFAULT 0,
-                    log_requests BOOLEAN DEFAULT 1,
-                    log_responses BOOLEAN DEFAULT 1,
-                    mask_token BOOLEAN DEFAULT 1,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            # Captcha config table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS captcha_config (
-                    id INTEGER PRIMARY KEY DEFAULT 1,
-                    captcha_method TEXT DEFAULT 'browser',
-                    yescaptcha_api_key TEXT DEFAULT '',
-                    yescaptcha_base_url TEXT DEFAULT 'https://api.yescaptcha.com',
-                    website_key TEXT DEFAULT '6LdsFiUsAAAAAIjVDZcuLhaHiDn5nnHVXVRQGeMV',
-                    page_action TEXT DEFAULT 'FLOW_GENERATION',
-                    browser_proxy_enabled BOOLEAN DEFAULT 0,
-                    browser_proxy_url TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
+            # ========== Step 4: Ensure hot-path indexes exist ==========
+            # get_token_by_email 每次插件上报都会执行; 轮换代理只取 enabled=1 的行
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS ix_tokens_email ON tokens(email)"
+            )
+            # 代理轮换查询 WHERE enabled=1 ORDER BY last_used_at:部分索引
+            # 直接给出有序扫描,取代旧的单列 enabled 索引
+            await db.execute("DROP INDEX IF EXISTS ix_proxy_pool_enabled")
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_proxy_enabled_used "
+                "ON proxy_pool(last_used_at) WHERE enabled = 1"
+            )
+            # 外键/热路径索引,与 init_db 保持一致(老库升级时补建)
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_token_stats_token_id ON token_stats(token_id)")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_tasks_token_id ON tasks(token_id)")
+            # (token_id, created_at DESC) 同时服务按 token 过滤和倒序分页,
+            # 旧的单列 token_id 索引被它完全覆盖,顺手清掉
+            await db.execute("DROP INDEX IF EXISTS idx_request_logs_token_id")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_request_logs_token_created ON request_logs(token_id, created_at DESC)")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_request_logs_created_at ON request_logs(created_at)")
+            await db.execute("DROP INDEX IF EXISTS idx_projects_token_id")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_projects_token_created ON projects(token_id, created_at DESC)")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_tokens_active ON tokens(is_active, banned_at)")
+            # get_active_tokens: WHERE is_active=1 ORDER BY last_used_at。
+            # 部分索引只收录活跃行:大量 token 被禁用后索引不随之膨胀,
+            # 查询是一次正向索引扫描;旧的 (is_active, last_used_at) 复合索引被取代
+            await db.execute("DROP INDEX IF EXISTS idx_tokens_active_lastused")
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_tokens_active_lastused "
+                "ON tokens(last_used_at) WHERE is_active = 1"
+            )
 
-            # Plugin config table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS plugin_config (
-                    id INTEGER PRIMARY KEY DEFAULT 1,
-                    connection_token TEXT DEFAULT '',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
+            # 记录 schema 版本,下次启动直接短路(PRAGMA 不支持参数绑定)
+            await db.execute(f"PRAGMA user_version = {CURRENT_SCHEMA_VERSION}")
 
-            # Proxy pool table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS proxy_pool (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    proxy_url TEXT NOT NULL,
-                    name TEXT,
-                    enabled BOOLEAN DEFAULT 1,
-                    success_count INTEGER DEFAULT 0,
-                    fail_count INTEGER DEFAULT 0,
-                    last_used_at TIMESTAMP,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
+            # 迁移后统计数据可能失效,重算 sqlite_stat1 供查询计划器使用
+            await db.execute("PRAGMA optimize")
 
-            # Proxy pool config table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS proxy_pool_config (
-                    id INTEGER PRIMARY KEY DEFAULT 1,
-                    pool_enabled BOOLEAN DEFAULT 0,
-                    rotation_mode TEXT DEFAULT 'round_robin',
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
+            await db.commit()
+            logger.info("Database migration check completed.")
 
-            # Create indexes
-            await db.execute("CREATE INDEX IF NOT EXISTS idx_task_id ON tasks(task_id)")
-            await db.execute("CREATE INDEX IF NOT EXISTS idx_token_st ON tokens(st)")
-            await db.execute("CREATE INDEX IF NOT EXISTS idx_project_id ON projects(project_id)")
+    async def init_db(self):
+        """Initialize database tables"""
+        async with self._connect() as db:
+            await db.executescript(_INIT_DDL)
 
             # Migrate request_logs table if needed
             await self._migrate_request_logs(db)
 
+            # 索引最后建,批量复制不用逐行维护 B-tree。
+            # 老库的 tokens 可能还缺 banned_at 等新列,对应索引建不了,
+            # 留给 check_and_migrate_db 补完列之后再建
+            try:
+                await db.executescript(_INIT_INDEX_DDL)
+            except aiosqlite.OperationalError as e:
+                logger.warning("  ⚠ Deferring index creation to migration: %s", e)
+
+            await db.execute("PRAGMA optimize")
             await db.commit()
 
     async def _migrate_request_logs(self, db):
@@ -579,7 +732,7 @@ class Database:
 
             if has_model and not has_operation:
                 # Old schema detected, need migration
-                print("🔄 检测到旧的request_logs表结构,开始迁移...")
+                logger.info("🔄 检测到旧的request_logs表结构,开始迁移...")
 
                 # Rename old table
                 await db.execute("ALTER TABLE request_logs RENAME TO request_logs_old")
@@ -600,45 +753,58 @@ class Database:
                 """)
 
                 # Migrate data from old table (basic migration)
-                await db.execute("""
-                    INSERT INTO request_logs (token_id, operation, request_body, status_code, duration, created_at)
-                    SELECT
-                        token_id,
-                        model as operation,
-                        json_object('model', model, 'prompt', substr(prompt, 1, 100)) as request_body,
-                        CASE
-                            WHEN status = 'completed' THEN 200
-                            WHEN status = 'failed' THEN 500
-                            ELSE 0
-                        END as status_code,
-                        response_time as duration,
-                        created_at
-                    FROM request_logs_old
-                """)
+                # 按 id 分批复制:限制单事务的内存/WAL 体积,批间 commit
+                # 让 checkpoint 有机会运行,大表迁移不会撑爆临时空间
+                chunk_size = 10000
+                last_id = 0
+                while True:
+                    cursor = await db.execute("""
+                        SELECT MAX(id) FROM (
+                            SELECT id FROM request_logs_old
+                            WHERE id > ? ORDER BY id LIMIT ?
+                        )
+                    """, (last_id, chunk_size))
+                    max_id = (await cursor.fetchone())[0]
+                    if max_id is None:
+                        break
+
+                    await db.execute("""
+                        INSERT INTO request_logs (token_id, operation, request_body, status_code, duration, created_at)
+                        SELECT
+                            token_id,
+                            model as operation,
+                            json_object('model', model, 'prompt', substr(prompt, 1, 100)) as request_body,
+                            CASE
+                                WHEN status = 'completed' THEN 200
+                                WHEN status = 'failed' THEN 500
+                                ELSE 0
+                            END as status_code,
+                            response_time as duration,
+                            created_at
+                        FROM request_logs_old
+                        WHERE id > ? AND id <= ?
+                    """, (last_id, max_id))
+                    await db.commit()
+                    last_id = max_id
 
                 # Drop old table
                 await db.execute("DROP TABLE request_logs_old")
 
-                print("✅ request_logs表迁移完成")
+                logger.info("✅ request_logs表迁移完成")
         except Exception as e:
-            print(f"⚠️ request_logs表迁移失败: {e}")
+            logger.warning("⚠️ request_logs表迁移失败: %s", e)
             # Continue even if migration fails
 
     # Token operations
     async def add_token(self, token: Token) -> int:
-        """Add a new token"""
-        async with aiosqlite.connect(self.db_path) as db:
+        """Add a new token (token + stats 行在同一事务里落盘,只付一次 fsync)"""
+        async with self._connect() as db:
             cursor = await db.execute("""
                 INSERT INTO tokens (st, at, at_expires, email, name, remark, is_active,
                                    credits, user_paygate_tier, current_project_id, current_project_name,
                                    image_enabled, video_enabled, image_concurrency, video_concurrency)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (token.st, token.at, token.at_expires, token.email, token.name, token.remark,
-                  token.is_active, token.credits, token.user_paygate_tier,
-                  token.current_project_id, token.current_project_name,
-                  token.image_enabled, token.video_enabled,
-                  token.image_concurrency, token.video_concurrency))
-            await db.commit()
+            """, _token_insert_params(token))
             token_id = cursor.lastrowid
 
             # Create stats entry
@@ -646,84 +812,132 @@ class Database:
                 INSERT INTO token_stats (token_id) VALUES (?)
             """, (token_id,))
             await db.commit()
+            self._token_list_cache.clear()
 
             return token_id
 
     async def get_token(self, token_id: int) -> Optional[Token]:
         """Get token by ID"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
             cursor = await db.execute("SELECT * FROM tokens WHERE id = ?", (token_id,))
             row = await cursor.fetchone()
             if row:
-                return Token(**dict(row))
+                return Token.from_row(row)
             return None
 
     async def get_token_by_st(self, st: str) -> Optional[Token]:
         """Get token by ST"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
             cursor = await db.execute("SELECT * FROM tokens WHERE st = ?", (st,))
             row = await cursor.fetchone()
             if row:
-                return Token(**dict(row))
+                return Token.from_row(row)
             return None
 
     async def get_token_by_email(self, email: str) -> Optional[Token]:
         """Get token by email"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
             cursor = await db.execute("SELECT * FROM tokens WHERE email = ?", (email,))
             row = await cursor.fetchone()
             if row:
-                return Token(**dict(row))
+                return Token.from_row(row)
             return None
 
     async def get_all_tokens(self) -> List[Token]:
-        """Get all tokens"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            cursor = await db.execute("SELECT * FROM tokens ORDER BY created_at DESC")
-            rows = await cursor.fetchall()
-            return [Token(**dict(row)) for row in rows]
+        """Get all tokens (写间隔内命中进程缓存,不触库)"""
+        cached = self._token_list_cache.get("all")
+        if cached is not None:
+            return cached
+        async with self._connect() as db:
+            # execute_fetchall 在 worker 线程里一次完成执行+取数,省一趟往返
+            rows = await db.execute_fetchall("SELECT * FROM tokens ORDER BY created_at DESC")
+            tokens = [Token.from_row(row) for row in rows]
+            self._token_list_cache["all"] = tokens
+            return tokens
 
     async def get_active_tokens(self) -> List[Token]:
-        """Get all active tokens"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            cursor = await db.execute("SELECT * FROM tokens WHERE is_active = 1 ORDER BY last_used_at ASC")
-            rows = await cursor.fetchall()
-            return [Token(**dict(row)) for row in rows]
+        """Get all active tokens (写间隔内命中进程缓存,不触库)"""
+        cached = self._token_list_cache.get("active")
+        if cached is not None:
+            return cached
+        async with self._connect() as db:
+            rows = await db.execute_fetchall("SELECT * FROM tokens WHERE is_active = 1 ORDER BY last_used_at ASC")
+            tokens = [Token.from_row(row) for row in rows]
+            self._token_list_cache["active"] = tokens
+            return tokens
 
     async def update_token(self, token_id: int, **kwargs):
-        """Update token fields"""
-        async with aiosqlite.connect(self.db_path) as db:
-            updates = []
-            params = []
+        """Update token fields (值为 None 的字段保持不变)"""
+        unknown = set(kwargs) - set(_TOKEN_UPDATE_COLS)
+        if unknown:
+            raise ValueError(f"Unknown token columns: {sorted(unknown)}")
+        if all(value is None for value in kwargs.values()):
+            return
+        async with self._connect() as db:
+            params = tuple(kwargs.get(c) for c in _TOKEN_UPDATE_COLS) + (token_id,)
+            await db.execute(_TOKEN_UPDATE_SQL, params)
+            await db.commit()
+            self._token_list_cache.clear()
 
-            for key, value in kwargs.items():
-                if value is not None:
-                    updates.append(f"{key} = ?")
-                    params.append(value)
+    async def update_token_session(
+        self,
+        token_id: int,
+        st: str,
+        at: str,
+        at_expires,
+        auto_enable: bool
+    ):
+        """Refresh a token's session credentials in one statement
 
-            if updates:
-                params.append(token_id)
-                query = f"UPDATE tokens SET {', '.join(updates)} WHERE id = ?"
-                await db.execute(query, params)
-                await db.commit()
+        单条 UPDATE 完成 ST/AT 写入、可选自动启用和 429 解禁,
+        取代 update_token + enable_token 的多次往返。
+        """
+        async with self._connect() as db:
+            await db.execute("""
+                UPDATE tokens
+                SET st = ?, at = ?, at_expires = ?,
+                    is_active = CASE WHEN ? AND is_active = 0 THEN 1 ELSE is_active END,
+                    banned_at = CASE WHEN ban_reason = '429_rate_limit' THEN NULL ELSE banned_at END,
+                    ban_reason = CASE WHEN ban_reason = '429_rate_limit' THEN NULL ELSE ban_reason END
+                WHERE id = ?
+            """, (st, at, at_expires, auto_enable, token_id))
+            await db.commit()
+            self._token_list_cache.clear()
+
+    async def disable_tokens(self, token_ids: List[int]):
+        """Disable multiple tokens with a single UPDATE"""
+        if not token_ids:
+            return
+        placeholders = ",".join("?" * len(token_ids))
+        async with self._connect() as db:
+            await db.execute(
+                f"UPDATE tokens SET is_active = 0 WHERE id IN ({placeholders})",
+                token_ids
+            )
+            await db.commit()
+            self._token_list_cache.clear()
 
     async def delete_token(self, token_id: int):
-        """Delete token and related data"""
-        async with aiosqlite.connect(self.db_path) as db:
+        """Delete token and related data
+
+        新库的外键已声明 ON DELETE CASCADE / SET NULL,理论上删 tokens 一条
+        即可;但旧库的外键没有级联 (改声明需要重建表),这里保留显式清理,
+        在级联库上它们是空操作,单事务内原子提交。
+        """
+        async with self._connect() as db:
+            # request_logs 保留历史,只解除 token 关联
+            await db.execute("UPDATE request_logs SET token_id = NULL WHERE token_id = ?", (token_id,))
+            await db.execute("DELETE FROM tasks WHERE token_id = ?", (token_id,))
             await db.execute("DELETE FROM token_stats WHERE token_id = ?", (token_id,))
             await db.execute("DELETE FROM projects WHERE token_id = ?", (token_id,))
             await db.execute("DELETE FROM tokens WHERE id = ?", (token_id,))
             await db.commit()
+            self._token_list_cache.clear()
 
     # Project operations
     async def add_project(self, project: Project) -> int:
         """Add a new project"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             cursor = await db.execute("""
                 INSERT INTO projects (project_id, token_id, project_name, tool_name, is_active)
                 VALUES (?, ?, ?, ?, ?)
@@ -734,35 +948,32 @@ class Database:
 
     async def get_project_by_id(self, project_id: str) -> Optional[Project]:
         """Get project by UUID"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
             cursor = await db.execute("SELECT * FROM projects WHERE project_id = ?", (project_id,))
             row = await cursor.fetchone()
             if row:
-                return Project(**dict(row))
+                return Project.from_row(row)
             return None
 
     async def get_projects_by_token(self, token_id: int) -> List[Project]:
         """Get all projects for a token"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            cursor = await db.execute(
+        async with self._connect() as db:
+            rows = await db.execute_fetchall(
                 "SELECT * FROM projects WHERE token_id = ? ORDER BY created_at DESC",
                 (token_id,)
             )
-            rows = await cursor.fetchall()
-            return [Project(**dict(row)) for row in rows]
+            return [Project.from_row(row) for row in rows]
 
     async def delete_project(self, project_id: str):
         """Delete project"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             await db.execute("DELETE FROM projects WHERE project_id = ?", (project_id,))
             await db.commit()
 
     # Task operations
     async def create_task(self, task: Task) -> int:
         """Create a new task"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             cursor = await db.execute("""
                 INSERT INTO tasks (task_id, token_id, model, prompt, status, progress, scene_id)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
@@ -773,37 +984,31 @@ class Database:
 
     async def get_task(self, task_id: str) -> Optional[Task]:
         """Get task by ID"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
             cursor = await db.execute("SELECT * FROM tasks WHERE task_id = ?", (task_id,))
             row = await cursor.fetchone()
             if row:
                 task_dict = dict(row)
                 # Parse result_urls from JSON
                 if task_dict.get("result_urls"):
-                    task_dict["result_urls"] = json.loads(task_dict["result_urls"])
+                    task_dict["result_urls"] = orjson.loads(task_dict["result_urls"])
                 return Task(**task_dict)
             return None
 
     async def update_task(self, task_id: str, **kwargs):
-        """Update task"""
-        async with aiosqlite.connect(self.db_path) as db:
-            updates = []
-            params = []
-
-            for key, value in kwargs.items():
-                if value is not None:
-                    # Convert list to JSON string for result_urls
-                    if key == "result_urls" and isinstance(value, list):
-                        value = json.dumps(value)
-                    updates.append(f"{key} = ?")
-                    params.append(value)
-
-            if updates:
-                params.append(task_id)
-                query = f"UPDATE tasks SET {', '.join(updates)} WHERE task_id = ?"
-                await db.execute(query, params)
-                await db.commit()
+        """Update task (值为 None 的字段保持不变)"""
+        unknown = set(kwargs) - set(_TASK_UPDATE_COLS)
+        if unknown:
+            raise ValueError(f"Unknown task columns: {sorted(unknown)}")
+        if all(value is None for value in kwargs.values()):
+            return
+        # Convert list to JSON string for result_urls
+        if isinstance(kwargs.get("result_urls"), list):
+            kwargs["result_urls"] = orjson.dumps(kwargs["result_urls"]).decode()
+        async with self._connect() as db:
+            params = tuple(kwargs.get(c) for c in _TASK_UPDATE_COLS) + (task_id,)
+            await db.execute(_TASK_UPDATE_SQL, params)
+            await db.commit()
 
     # Token stats operations (kept for compatibility, now delegates to specific methods)
     async def increment_token_stats(self, token_id: int, stat_type: str):
@@ -817,70 +1022,88 @@ class Database:
 
     async def get_token_stats(self, token_id: int) -> Optional[TokenStats]:
         """Get token statistics"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
             cursor = await db.execute("SELECT * FROM token_stats WHERE token_id = ?", (token_id,))
             row = await cursor.fetchone()
             if row:
-                return TokenStats(**dict(row))
+                return TokenStats.from_row(row)
             return None
 
-    async def increment_image_count(self, token_id: int):
-        """Increment image generation count with daily reset"""
-        from datetime import date
-        async with aiosqlite.connect(self.db_path) as db:
-            today = str(date.today())
-            # Get current stats
-            cursor = await db.execute("SELECT today_date FROM token_stats WHERE token_id = ?", (token_id,))
+    async def get_global_stats(self) -> dict:
+        """Aggregate token counts and generation statistics in SQL
+
+        Returns the dashboard totals in two constant-size queries instead
+        of materialising every token/stats row in Python.
+        """
+        async with self._connect() as db:
+            cursor = await db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(is_active), 0) FROM tokens"
+            )
+            total_tokens, active_tokens = await cursor.fetchone()
+
+            cursor = await db.execute("""
+                SELECT
+                    COALESCE(SUM(image_count), 0),
+                    COALESCE(SUM(video_count), 0),
+                    COALESCE(SUM(error_count), 0),
+                    COALESCE(SUM(today_image_count), 0),
+                    COALESCE(SUM(today_video_count), 0),
+                    COALESCE(SUM(today_error_count), 0)
+                FROM token_stats
+            """)
             row = await cursor.fetchone()
 
-            # If date changed, reset today's count
-            if row and row[0] != today:
-                await db.execute("""
-                    UPDATE token_stats
-                    SET image_count = image_count + 1,
-                        today_image_count = 1,
-                        today_date = ?
-                    WHERE token_id = ?
-                """, (today, token_id))
-            else:
-                # Same day, just increment both
-                await db.execute("""
-                    UPDATE token_stats
-                    SET image_count = image_count + 1,
-                        today_image_count = today_image_count + 1,
-                        today_date = ?
-                    WHERE token_id = ?
-                """, (today, token_id))
+            return {
+                "total_tokens": total_tokens,
+                "active_tokens": active_tokens,
+                "total_images": row[0],
+                "total_videos": row[1],
+                "total_errors": row[2],
+                "today_images": row[3],
+                "today_videos": row[4],
+                "today_errors": row[5]
+            }
+
+    async def get_all_token_stats(self) -> dict:
+        """Get statistics for all tokens in one query, keyed by token_id"""
+        async with self._connect() as db:
+            rows = await db.execute_fetchall("SELECT * FROM token_stats")
+            return {row["token_id"]: TokenStats.from_row(row) for row in rows}
+
+    def _today_str(self) -> str:
+        """当天日期字符串 (增量统计的绑定参数,按秒缓存避免重复格式化)"""
+        now = time.monotonic()
+        ts, value = self._today_cache
+        if not value or now - ts >= 1.0:
+            value = str(date.today())
+            self._today_cache = (now, value)
+        return value
+
+    async def increment_image_count(self, token_id: int):
+        """Increment image generation count with daily reset"""
+        today = self._today_str()
+        async with self._connect() as db:
+            # 跨天判断放进 CASE,单条 UPDATE 搞定读-判-写
+            await db.execute("""
+                UPDATE token_stats
+                SET image_count = image_count + 1,
+                    today_image_count = CASE WHEN today_date = ? THEN today_image_count + 1 ELSE 1 END,
+                    today_date = ?
+                WHERE token_id = ?
+            """, (today, today, token_id))
             await db.commit()
 
     async def increment_video_count(self, token_id: int):
         """Increment video generation count with daily reset"""
-        from datetime import date
-        async with aiosqlite.connect(self.db_path) as db:
-            today = str(date.today())
-            # Get current stats
-            cursor = await db.execute("SELECT today_date FROM token_stats WHERE token_id = ?", (token_id,))
-            row = await cursor.fetchone()
-
-            # If date changed, reset today's count
-            if row and row[0] != today:
-                await db.execute("""
-                    UPDATE token_stats
-                    SET video_count = video_count + 1,
-                        today_video_count = 1,
-                        today_date = ?
-                    WHERE token_id = ?
-                """, (today, token_id))
-            else:
-                # Same day, just increment both
-                await db.execute("""
-                    UPDATE token_stats
-                    SET video_count = video_count + 1,
-                        today_video_count = today_video_count + 1,
-                        today_date = ?
-                    WHERE token_id = ?
-                """, (today, token_id))
+        today = self._today_str()
+        async with self._connect() as db:
+            await db.execute("""
+                UPDATE token_stats
+                SET video_count = video_count + 1,
+                    today_video_count = CASE WHEN today_date = ? THEN today_video_count + 1 ELSE 1 END,
+                    today_date = ?
+                WHERE token_id = ?
+            """, (today, today, token_id))
             await db.commit()
 
     async def increment_error_count(self, token_id: int):
@@ -891,35 +1114,17 @@ class Database:
         - consecutive_error_count: Consecutive errors (reset on success/enable)
         - today_error_count: Today's errors (reset on date change)
         """
-        from datetime import date
-        async with aiosqlite.connect(self.db_path) as db:
-            today = str(date.today())
-            # Get current stats
-            cursor = await db.execute("SELECT today_date FROM token_stats WHERE token_id = ?", (token_id,))
-            row = await cursor.fetchone()
-
-            # If date changed, reset today's error count
-            if row and row[0] != today:
-                await db.execute("""
-                    UPDATE token_stats
-                    SET error_count = error_count + 1,
-                        consecutive_error_count = consecutive_error_count + 1,
-                        today_error_count = 1,
-                        today_date = ?,
-                        last_error_at = CURRENT_TIMESTAMP
-                    WHERE token_id = ?
-                """, (today, token_id))
-            else:
-                # Same day, just increment all counters
-                await db.execute("""
-                    UPDATE token_stats
-                    SET error_count = error_count + 1,
-                        consecutive_error_count = consecutive_error_count + 1,
-                        today_error_count = today_error_count + 1,
-                        today_date = ?,
-                        last_error_at = CURRENT_TIMESTAMP
-                    WHERE token_id = ?
-                """, (today, token_id))
+        today = self._today_str()
+        async with self._connect() as db:
+            await db.execute("""
+                UPDATE token_stats
+                SET error_count = error_count + 1,
+                    consecutive_error_count = consecutive_error_count + 1,
+                    today_error_count = CASE WHEN today_date = ? THEN today_error_count + 1 ELSE 1 END,
+                    today_date = ?,
+                    last_error_at = CURRENT_TIMESTAMP
+                WHERE token_id = ?
+            """, (today, today, token_id))
             await db.commit()
 
     async def reset_error_count(self, token_id: int):
@@ -931,7 +1136,7 @@ class Database:
 
         Note: error_count (total historical errors) is NEVER reset
         """
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             await db.execute("""
                 UPDATE token_stats SET consecutive_error_count = 0 WHERE token_id = ?
             """, (token_id,))
@@ -940,131 +1145,164 @@ class Database:
     # Config operations
     async def get_admin_config(self) -> Optional[AdminConfig]:
         """Get admin configuration"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        cached = self._config_cache.get("admin_config")
+        if cached is not None:
+            return cached
+        async with self._connect() as db:
             cursor = await db.execute("SELECT * FROM admin_config WHERE id = 1")
             row = await cursor.fetchone()
             if row:
-                return AdminConfig(**dict(row))
+                admin_config = AdminConfig(**dict(row))
+                self._config_cache["admin_config"] = admin_config
+                return admin_config
             return None
 
     async def update_admin_config(self, **kwargs):
-        """Update admin configuration"""
-        async with aiosqlite.connect(self.db_path) as db:
-            updates = []
-            params = []
-
-            for key, value in kwargs.items():
-                if value is not None:
-                    updates.append(f"{key} = ?")
-                    params.append(value)
-
-            if updates:
-                updates.append("updated_at = CURRENT_TIMESTAMP")
-                query = f"UPDATE admin_config SET {', '.join(updates)} WHERE id = 1"
-                await db.execute(query, params)
-                await db.commit()
+        """Update admin configuration (值为 None 的字段保持不变)"""
+        unknown = set(kwargs) - set(_ADMIN_UPDATE_COLS)
+        if unknown:
+            raise ValueError(f"Unknown admin_config columns: {sorted(unknown)}")
+        if all(value is None for value in kwargs.values()):
+            return
+        async with self._connect() as db:
+            params = tuple(kwargs.get(c) for c in _ADMIN_UPDATE_COLS)
+            await db.execute(_ADMIN_UPDATE_SQL, params)
+            await db.commit()
+            self._config_cache.pop("admin_config", None)
 
     async def get_proxy_config(self) -> Optional[ProxyConfig]:
         """Get proxy configuration"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        cached = self._config_cache.get("proxy_config")
+        if cached is not None:
+            return cached
+        async with self._connect() as db:
             cursor = await db.execute("SELECT * FROM proxy_config WHERE id = 1")
             row = await cursor.fetchone()
             if row:
-                return ProxyConfig(**dict(row))
+                proxy_config = ProxyConfig(**dict(row))
+                self._config_cache["proxy_config"] = proxy_config
+                return proxy_config
             return None
 
     async def update_proxy_config(self, enabled: bool, proxy_url: Optional[str] = None):
         """Update proxy configuration"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             await db.execute("""
                 UPDATE proxy_config
                 SET enabled = ?, proxy_url = ?, updated_at = CURRENT_TIMESTAMP
                 WHERE id = 1
             """, (enabled, proxy_url))
             await db.commit()
+            self._config_cache.pop("proxy_config", None)
 
     async def get_generation_config(self) -> Optional[GenerationConfig]:
         """Get generation configuration"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        cached = self._config_cache.get("generation_config")
+        if cached is not None:
+            return cached
+        async with self._connect() as db:
             cursor = await db.execute("SELECT * FROM generation_config WHERE id = 1")
             row = await cursor.fetchone()
             if row:
-                return GenerationConfig(**dict(row))
+                generation_config = GenerationConfig(**dict(row))
+                self._config_cache["generation_config"] = generation_config
+                return generation_config
             return None
 
     async def update_generation_config(self, image_timeout: int, video_timeout: int):
         """Update generation configuration"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             await db.execute("""
                 UPDATE generation_config
                 SET image_timeout = ?, video_timeout = ?, updated_at = CURRENT_TIMESTAMP
                 WHERE id = 1
             """, (image_timeout, video_timeout))
             await db.commit()
+            self._config_cache.pop("generation_config", None)
 
     # Request log operations
     async def add_request_log(self, log: RequestLog):
-        """Add request log"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
+        """Add request log (入队即返回,由后台协程合批落盘)"""
+        if self._log_queue is None:
+            self._log_queue = asyncio.Queue()
+            self._log_flusher_task = asyncio.create_task(self._log_flusher())
+        self._log_queue.put_nowait(log)
+
+    def _drain_log_queue(self, items: list = None, limit: Optional[int] = _LOG_FLUSH_BATCH) -> list:
+        """把队列里现有的日志取出来(limit=None 表示全取)"""
+        if items is None:
+            items = []
+        while limit is None or len(items) < limit:
+            try:
+                items.append(self._log_queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return items
+
+    async def _flush_logs(self, items: list):
+        """一个事务写入一批日志,fsync 摊给整批"""
+        async with self._connect() as db:
+            await db.executemany("""
                 INSERT INTO request_logs (token_id, operation, request_body, response_body, status_code, duration)
                 VALUES (?, ?, ?, ?, ?, ?)
-            """, (log.token_id, log.operation, log.request_body, log.response_body,
-                  log.status_code, log.duration))
+            """, [log.as_insert_tuple() for log in items])
             await db.commit()
 
+    async def _log_flusher(self):
+        """后台日志落盘协程:来第一条后等一个小窗口攒批再写"""
+        while True:
+            items = [await self._log_queue.get()]
+            try:
+                await asyncio.sleep(_LOG_FLUSH_INTERVAL)
+            except asyncio.CancelledError:
+                # 关停:把手里的和队列里剩余的全部落盘再退出
+                await self._flush_logs(self._drain_log_queue(items, limit=None))
+                raise
+            items = self._drain_log_queue(items)
+            try:
+                await self._flush_logs(items)
+            except Exception as e:
+                logger.warning("⚠️ request_logs 批量写入失败: %s", e)
+
     async def get_logs(self, limit: int = 100, token_id: Optional[int] = None):
-        """Get request logs with token email"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        """Get request logs with token email
 
+        不再 LEFT JOIN tokens:token 列表有进程内缓存,在 Python 里
+        按 id 补 email/name 比每行一次索引探测便宜。
+        """
+        async with self._connect() as db:
             if token_id:
                 cursor = await db.execute("""
-                    SELECT
-                        rl.id,
-                        rl.token_id,
-                        rl.operation,
-                        rl.request_body,
-                        rl.response_body,
-                        rl.status_code,
-                        rl.duration,
-                        rl.created_at,
-                        t.email as token_email,
-                        t.name as token_username
-                    FROM request_logs rl
-                    LEFT JOIN tokens t ON rl.token_id = t.id
-                    WHERE rl.token_id = ?
-                    ORDER BY rl.created_at DESC
+                    SELECT id, token_id, operation, request_body, response_body,
+                           status_code, duration, created_at
+                    FROM request_logs
+                    WHERE token_id = ?
+                    ORDER BY created_at DESC
                     LIMIT ?
                 """, (token_id, limit))
             else:
                 cursor = await db.execute("""
-                    SELECT
-                        rl.id,
-                        rl.token_id,
-                        rl.operation,
-                        rl.request_body,
-                        rl.response_body,
-                        rl.status_code,
-                        rl.duration,
-                        rl.created_at,
-                        t.email as token_email,
-                        t.name as token_username
-                    FROM request_logs rl
-                    LEFT JOIN tokens t ON rl.token_id = t.id
-                    ORDER BY rl.created_at DESC
+                    SELECT id, token_id, operation, request_body, response_body,
+                           status_code, duration, created_at
+                    FROM request_logs
+                    ORDER BY created_at DESC
                     LIMIT ?
                 """, (limit,))
 
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+            # 逐批迭代游标直接出 dict,不先 fetchall 出一整个 Row 列表
+            logs = [dict(row) async for row in cursor]
+
+        # 锁外补 token 信息 (get_all_tokens 持锁且通常命中缓存)
+        tokens = {t.id: t for t in await self.get_all_tokens()}
+        for log in logs:
+            token = tokens.get(log["token_id"])
+            log["token_email"] = token.email if token else None
+            log["token_username"] = token.name if token else None
+        return logs
 
     async def clear_all_logs(self):
         """Clear all request logs"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             await db.execute("DELETE FROM request_logs")
             await db.commit()
 
@@ -1077,7 +1315,7 @@ class Database:
             is_first_startup: If True, initialize all config rows from setting.toml.
                             If False (upgrade mode), only ensure missing config rows exist with default values.
         """
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             if is_first_startup:
                 # First startup: Initialize all config tables with values from setting.toml
                 await self._ensure_config_rows(db, config_dict)
@@ -1097,9 +1335,10 @@ class Database:
         - Cache config (enabled, timeout, base_url)
         - Generation config (image_timeout, video_timeout)
         - Proxy config will be handled by ProxyManager
-        """
-        from .config import config
 
+        五个 getter 都走 _config_cache:刚被 update_* 失效的那个查一次库,
+        其余命中缓存,整个重载通常只有一条 SELECT。
+        """
         # Reload admin config
         admin_config = await self.get_admin_config()
         if admin_config:
@@ -1135,19 +1374,24 @@ class Database:
     # Cache config operations
     async def get_cache_config(self) -> CacheConfig:
         """Get cache configuration"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        cached = self._config_cache.get("cache_config")
+        if cached is not None:
+            return cached
+        async with self._connect() as db:
             cursor = await db.execute("SELECT * FROM cache_config WHERE id = 1")
             row = await cursor.fetchone()
             if row:
-                return CacheConfig(**dict(row))
+                cache_config = CacheConfig(**dict(row))
+                self._config_cache["cache_config"] = cache_config
+                return cache_config
             # Return default if not found
             return CacheConfig(cache_enabled=False, cache_timeout=7200)
 
     async def update_cache_config(self, enabled: bool = None, timeout: int = None, base_url: Optional[str] = None):
         """Update cache configuration"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        if enabled is None and timeout is None and base_url is None:
+            return  # 全部未提供:不必过锁/开事务
+        async with self._connect() as db:
             # Get current values
             cursor = await db.execute("SELECT * FROM cache_config WHERE id = 1")
             row = await cursor.fetchone()
@@ -1180,17 +1424,22 @@ class Database:
                 """, (new_enabled, new_timeout, new_base_url))
 
             await db.commit()
+            self._config_cache.pop("cache_config", None)
 
     # Debug config operations
     async def get_debug_config(self) -> 'DebugConfig':
         """Get debug configuration"""
         from .models import DebugConfig
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        cached = self._config_cache.get("debug_config")
+        if cached is not None:
+            return cached
+        async with self._connect() as db:
             cursor = await db.execute("SELECT * FROM debug_config WHERE id = 1")
             row = await cursor.fetchone()
             if row:
-                return DebugConfig(**dict(row))
+                debug_config = DebugConfig(**dict(row))
+                self._config_cache["debug_config"] = debug_config
+                return debug_config
             # Return default if not found
             return DebugConfig(enabled=False, log_requests=True, log_responses=True, mask_token=True)
 
@@ -1202,8 +1451,9 @@ class Database:
         mask_token: bool = None
     ):
         """Update debug configuration"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        if enabled is None and log_requests is None and log_responses is None and mask_token is None:
+            return
+        async with self._connect() as db:
             # Get current values
             cursor = await db.execute("SELECT * FROM debug_config WHERE id = 1")
             row = await cursor.fetchone()
@@ -1234,16 +1484,21 @@ class Database:
                 """, (new_enabled, new_log_requests, new_log_responses, new_mask_token))
 
             await db.commit()
+            self._config_cache.pop("debug_config", None)
 
     # Captcha config operations
     async def get_captcha_config(self) -> CaptchaConfig:
         """Get captcha configuration"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        cached = self._config_cache.get("captcha_config")
+        if cached is not None:
+            return cached
+        async with self._connect() as db:
             cursor = await db.execute("SELECT * FROM captcha_config WHERE id = 1")
             row = await cursor.fetchone()
             if row:
-                return CaptchaConfig(**dict(row))
+                captcha_config = CaptchaConfig(**dict(row))
+                self._config_cache["captcha_config"] = captcha_config
+                return captcha_config
             return CaptchaConfig()
 
     async def update_captcha_config(
@@ -1255,8 +1510,10 @@ class Database:
         browser_proxy_url: str = None
     ):
         """Update captcha configuration"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        if (captcha_method is None and yescaptcha_api_key is None and yescaptcha_base_url is None
+                and browser_proxy_enabled is None and browser_proxy_url is None):
+            return
+        async with self._connect() as db:
             cursor = await db.execute("SELECT * FROM captcha_config WHERE id = 1")
             row = await cursor.fetchone()
 
@@ -1287,22 +1544,26 @@ class Database:
                 """, (new_method, new_api_key, new_base_url, new_proxy_enabled, new_proxy_url))
 
             await db.commit()
+            self._config_cache.pop("captcha_config", None)
 
     # Plugin config operations
     async def get_plugin_config(self) -> PluginConfig:
         """Get plugin configuration"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        cached = self._config_cache.get("plugin_config")
+        if cached is not None:
+            return cached
+        async with self._connect() as db:
             cursor = await db.execute("SELECT * FROM plugin_config WHERE id = 1")
             row = await cursor.fetchone()
             if row:
-                return PluginConfig(**dict(row))
+                plugin_config = PluginConfig(**dict(row))
+                self._config_cache["plugin_config"] = plugin_config
+                return plugin_config
             return PluginConfig()
 
     async def update_plugin_config(self, connection_token: str, auto_enable_on_update: bool = True):
         """Update plugin configuration"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
             cursor = await db.execute("SELECT * FROM plugin_config WHERE id = 1")
             row = await cursor.fetchone()
 
@@ -1319,12 +1580,17 @@ class Database:
                 """, (connection_token, auto_enable_on_update))
 
             await db.commit()
+            # 写穿缓存:update-token 热路径在改动后也无需回查 DB
+            self._config_cache["plugin_config"] = PluginConfig(
+                connection_token=connection_token,
+                auto_enable_on_update=auto_enable_on_update
+            )
 
     # ========== Proxy Pool Operations ==========
 
     async def add_proxy_pool_item(self, proxy_url: str, name: str = None) -> int:
         """Add a proxy to the pool"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             cursor = await db.execute("""
                 INSERT INTO proxy_pool (proxy_url, name, enabled)
                 VALUES (?, ?, 1)
@@ -1332,78 +1598,131 @@ class Database:
             await db.commit()
             return cursor.lastrowid
 
-    async def get_all_proxy_pool_items(self) -> list:
-        """Get all proxies in the pool"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            cursor = await db.execute("""
-                SELECT * FROM proxy_pool ORDER BY created_at DESC
-            """)
+    async def get_all_proxy_pool_items(self, limit: Optional[int] = None, offset: int = 0) -> list:
+        """Get proxies in the pool (分页在 SQL 侧完成,默认返回全部)"""
+        async with self._connect() as db:
+            if limit is not None:
+                cursor = await db.execute("""
+                    SELECT id, proxy_url, name, enabled, success_count, fail_count, last_used_at, created_at
+                    FROM proxy_pool ORDER BY created_at DESC LIMIT ? OFFSET ?
+                """, (limit, offset))
+            else:
+                cursor = await db.execute("""
+                    SELECT id, proxy_url, name, enabled, success_count, fail_count, last_used_at, created_at
+                    FROM proxy_pool ORDER BY created_at DESC
+                """)
             rows = await cursor.fetchall()
             return [dict(row) for row in rows]
 
     async def get_enabled_proxy_pool_items(self) -> list:
         """Get all enabled proxies in the pool"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            cursor = await db.execute("""
-                SELECT * FROM proxy_pool WHERE enabled = 1 ORDER BY last_used_at ASC NULLS FIRST
+        async with self._connect() as db:
+            rows = await db.execute_fetchall("""
+                SELECT id, proxy_url, name, enabled, success_count, fail_count, last_used_at, created_at
+                FROM proxy_pool WHERE enabled = 1 ORDER BY last_used_at ASC NULLS FIRST
             """)
-            rows = await cursor.fetchall()
             return [dict(row) for row in rows]
 
-    async def update_proxy_pool_item(self, proxy_id: int, **kwargs):
-        """Update a proxy in the pool"""
-        async with aiosqlite.connect(self.db_path) as db:
-            updates = []
-            params = []
-            for key, value in kwargs.items():
-                if value is not None:
-                    updates.append(f"{key} = ?")
-                    params.append(value)
-            if updates:
-                params.append(proxy_id)
-                query = f"UPDATE proxy_pool SET {', '.join(updates)} WHERE id = ?"
-                await db.execute(query, params)
-                await db.commit()
+    async def update_proxy_pool_item(
+        self,
+        proxy_id: int,
+        proxy_url: Optional[str] = None,
+        name: Optional[str] = None,
+        enabled: Optional[bool] = None
+    ):
+        """Update a proxy in the pool (固定的单条 COALESCE UPDATE,None 表示不修改)"""
+        async with self._connect() as db:
+            await db.execute("""
+                UPDATE proxy_pool
+                SET proxy_url = COALESCE(?, proxy_url),
+                    name = COALESCE(?, name),
+                    enabled = COALESCE(?, enabled)
+                WHERE id = ?
+            """, (proxy_url, name, enabled, proxy_id))
+            await db.commit()
+
+    async def toggle_proxy_pool_item(self, proxy_id: int) -> Optional[bool]:
+        """Flip a proxy's enabled flag atomically, returning the new value
+
+        单条 UPDATE ... RETURNING (SQLite 3.35+),没有读-改-写竞争窗口。
+        不存在的 id 返回 None。
+        """
+        async with self._connect() as db:
+            cursor = await db.execute("""
+                UPDATE proxy_pool SET enabled = NOT enabled WHERE id = ? RETURNING enabled
+            """, (proxy_id,))
+            row = await cursor.fetchone()
+            await db.commit()
+            return bool(row[0]) if row else None
 
     async def delete_proxy_pool_item(self, proxy_id: int):
         """Delete a proxy from the pool"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             await db.execute("DELETE FROM proxy_pool WHERE id = ?", (proxy_id,))
             await db.commit()
 
     async def record_proxy_usage(self, proxy_id: int, success: bool):
-        """Record proxy usage statistics"""
-        async with aiosqlite.connect(self.db_path) as db:
-            if success:
-                await db.execute("""
-                    UPDATE proxy_pool 
-                    SET success_count = success_count + 1, last_used_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                """, (proxy_id,))
-            else:
-                await db.execute("""
-                    UPDATE proxy_pool 
-                    SET fail_count = fail_count + 1, last_used_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                """, (proxy_id,))
+        """Record proxy usage statistics (入缓冲即返回,由后台协程合并落盘)
+
+        同一事件循环内的 dict 增量没有 await 点,无需加锁。
+        """
+        if self._proxy_usage_task is None:
+            self._proxy_usage_task = asyncio.create_task(self._proxy_usage_flusher())
+        ok, fail = self._proxy_usage_buffer.get(proxy_id, (0, 0))
+        if success:
+            ok += 1
+        else:
+            fail += 1
+        self._proxy_usage_buffer[proxy_id] = (ok, fail)
+
+    async def _flush_proxy_usage(self):
+        """把缓冲的使用计数用一个事务写回 proxy_pool"""
+        buffer, self._proxy_usage_buffer = self._proxy_usage_buffer, {}
+        if not buffer:
+            return
+        async with self._connect() as db:
+            await db.executemany("""
+                UPDATE proxy_pool
+                SET success_count = success_count + ?, fail_count = fail_count + ?,
+                    last_used_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, [(ok, fail, pid) for pid, (ok, fail) in buffer.items()])
             await db.commit()
+        if self.on_proxy_usage_flushed is not None:
+            self.on_proxy_usage_flushed()
+
+    async def _proxy_usage_flusher(self):
+        """后台协程:按固定间隔把代理使用计数合并落盘"""
+        while True:
+            try:
+                await asyncio.sleep(_PROXY_USAGE_FLUSH_INTERVAL)
+            except asyncio.CancelledError:
+                await self._flush_proxy_usage()
+                raise
+            try:
+                await self._flush_proxy_usage()
+            except Exception as e:
+                logger.error("代理使用统计落盘失败: %s", e)
 
     async def get_proxy_pool_config(self) -> dict:
         """Get proxy pool configuration"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        cached = self._config_cache.get("proxy_pool_config")
+        if cached is not None:
+            return cached
+        async with self._connect() as db:
             cursor = await db.execute("SELECT * FROM proxy_pool_config WHERE id = 1")
             row = await cursor.fetchone()
-            if row:
-                return dict(row)
-            return {"pool_enabled": False, "rotation_mode": "round_robin"}
+            # 没有行时把默认值也缓存:update_proxy_pool_config 首次写入
+            # 会补行并使缓存失效
+            pool_config = dict(row) if row else {"pool_enabled": False, "rotation_mode": "round_robin"}
+            self._config_cache["proxy_pool_config"] = pool_config
+            return pool_config
 
     async def update_proxy_pool_config(self, pool_enabled: bool = None, rotation_mode: str = None):
         """Update proxy pool configuration"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        if pool_enabled is None and rotation_mode is None:
+            return
+        async with self._connect() as db:
             cursor = await db.execute("SELECT * FROM proxy_pool_config WHERE id = 1")
             row = await cursor.fetchone()
 
@@ -1424,3 +1743,4 @@ class Database:
                     VALUES (1, ?, ?)
                 """, (new_enabled, new_mode))
             await db.commit()
+            self._config_cache.pop("proxy_pool_config", None)
@@ -42,6 +42,22 @@ class Token(BaseModel):
     ban_reason: Optional[str] = None  # 禁用原因: "429_rate_limit" 或 None
     banned_at: Optional[datetime] = None  # 禁用时间
 
+    @classmethod
+    def from_row(cls, row) -> "Token":
+        """从数据库行直接构造,跳过 pydantic 逐字段校验 (热路径)
+
+        行数据来自我们自己的 schema,类型可信;只需手动把 TIMESTAMP
+        列的 ISO 字符串转成 datetime、0/1 转成 bool。
+        """
+        data = dict(row)
+        for key in ("at_expires", "created_at", "last_used_at", "banned_at"):
+            value = data.get(key)
+            if isinstance(value, str):
+                data[key] = datetime.fromisoformat(value)
+        for key in ("is_active", "image_enabled", "video_enabled"):
+            data[key] = bool(data[key])
+        return cls.model_construct(**data)
+
 
 class Project(BaseModel):
     """Project model for VideoFX"""
@@ -53,6 +69,16 @@ class Project(BaseModel):
     is_active: bool = True
     created_at: Optional[datetime] = None
 
+    @classmethod
+    def from_row(cls, row) -> "Project":
+        """从数据库行直接构造,跳过 pydantic 逐字段校验 (热路径)"""
+        data = dict(row)
+        value = data.get("created_at")
+        if isinstance(value, str):
+            data["created_at"] = datetime.fromisoformat(value)
+        data["is_active"] = bool(data["is_active"])
+        return cls.model_construct(**data)
+
 
 class TokenStats(BaseModel):
     """Token statistics"""
@@ -71,6 +97,17 @@ class TokenStats(BaseModel):
     # 连续错误计数 (用于自动禁用判断)
     consecutive_error_count: int = 0
 
+    @classmethod
+    def from_row(cls, row) -> "TokenStats":
+        """从数据库行直接构造,跳过 pydantic 逐字段校验 (热路径)"""
+        data = dict(row)
+        data.pop("id", None)  # token_stats 自己的主键不在模型里
+        for key in ("last_success_at", "last_error_at"):
+            value = data.get(key)
+            if isinstance(value, str):
+                data[key] = datetime.fromisoformat(value)
+        return cls.model_construct(**data)
+
 
 class Task(BaseModel):
     """Generation task"""
@@ -99,6 +136,11 @@ class RequestLog(BaseModel):
     duration: float
     created_at: Optional[datetime] = None
 
+    def as_insert_tuple(self) -> tuple:
+        """request_logs 表 INSERT 的绑定参数 (与列顺序一致)"""
+        return (self.token_id, self.operation, self.request_body,
+                self.response_body, self.status_code, self.duration)
+
 
 class AdminConfig(BaseModel):
     """Admin configuration"""
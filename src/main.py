@@ -1,6 +1,8 @@
 """FastAPI application initialization"""
+import logging
+
 from fastapi import FastAPI
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
@@ -16,6 +18,10 @@ from .services.concurrency_manager import ConcurrencyManager
 from .services.generation_handler import GenerationHandler
 from .api import routes, admin
 
+# 根 logger 默认只放行 WARNING,数据库迁移等模块的 INFO 日志会被吞掉;
+# basicConfig 在已有 handler 时是空操作,不会覆盖部署方自己的配置
+logging.basicConfig(level=logging.INFO)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -142,6 +148,10 @@ async def lifespan(app: FastAPI):
         await auto_unban_task_handle
     except asyncio.CancelledError:
         pass
+    # Close shared HTTP session
+    await flow_client.close()
+    # Close shared database connection
+    await db.close()
     # Close browser if initialized
     if browser_service:
         await browser_service.close()
@@ -175,7 +185,8 @@ app = FastAPI(
     title="Flow2API",
     description="OpenAI-compatible API for Google VideoFX (Veo)",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -28,6 +28,8 @@ class FileCache:
         self.default_timeout = default_timeout
         self.proxy_manager = proxy_manager
         self._cleanup_task = None
+        # 在途下载登记表:同一文件的并发请求共享一次下载 (单飞)
+        self._inflight = {}
 
     async def start_cleanup_task(self):
         """Start background cleanup task"""
@@ -65,16 +67,18 @@ class FileCache:
             current_time = time.time()
             removed_count = 0
 
-            for file_path in self.cache_dir.iterdir():
-                if file_path.is_file():
-                    # Check file age
-                    file_age = current_time - file_path.stat().st_mtime
-                    if file_age > self.default_timeout:
-                        try:
-                            file_path.unlink()
-                            removed_count += 1
-                        except Exception:
-                            pass
+            # os.scandir 复用目录项里缓存的 stat,不必每个文件再发一次系统调用
+            with os.scandir(self.cache_dir) as entries:
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False):
+                        # Check file age
+                        file_age = current_time - entry.stat().st_mtime
+                        if file_age > self.default_timeout:
+                            try:
+                                os.unlink(entry.path)
+                                removed_count += 1
+                            except Exception:
+                                pass
 
             if removed_count > 0:
                 debug_logger.log_info(f"Cleanup: removed {removed_count} expired cache files")
@@ -88,8 +92,9 @@ class FileCache:
 
     def _generate_cache_filename(self, url: str, media_type: str) -> str:
         """Generate unique filename for cached file"""
-        # Use URL hash as filename
-        url_hash = hashlib.md5(url.encode()).hexdigest()
+        # Use URL hash as filename (blake2b 比 md5 快且无冲突顾虑;
+        # 旧的 md5 命名文件不迁移,过期后由清理任务自然淘汰)
+        url_hash = hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
 
         # Determine file extension
         if media_type == "video":
@@ -129,7 +134,20 @@ class FileCache:
                 except Exception:
                     pass
 
-        # Download file with retry logic (不使用代理)
+        # 单飞去重:同一 URL 的突发并发只下载一次,其余请求等结果
+        task = self._inflight.get(filename)
+        if task is None:
+            task = asyncio.create_task(
+                self._download_with_retry(url, file_path, filename, max_retries)
+            )
+            self._inflight[filename] = task
+            task.add_done_callback(lambda _, f=filename: self._inflight.pop(f, None))
+        else:
+            debug_logger.log_info(f"Download already in flight, waiting: {filename}")
+        return await task
+
+    async def _download_with_retry(self, url: str, file_path: Path, filename: str, max_retries: int) -> str:
+        """Download with retry logic (不使用代理)"""
         debug_logger.log_info(f"Downloading file from: {url}")
 
         last_error = None
@@ -156,11 +174,33 @@ class FileCache:
 
         raise Exception(f"Failed to cache file after {max_retries} attempts: {last_error}")
 
-    async def _try_download(self, url: str, file_path: Path, proxy_url: str, filename: str) -> Optional[str]:
-        """Try to download file using various methods"""
+    async def _run_download_command(self, cmd: list, tool: str) -> Optional[str]:
+        """Run a download subprocess without blocking the event loop
+
+        返回 None 表示退出码为 0;否则返回 stderr 文本。超时杀掉子进程。
+        """
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            _, stderr = await asyncio.wait_for(proc.communicate(), timeout=90)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.communicate()
+            raise Exception(f"{tool} timed out")
+        if proc.returncode == 0:
+            return None
+        return stderr.decode('utf-8', errors='ignore') if stderr else ""
 
     async def _try_download(self, url: str, file_path: Path, proxy_url: str, filename: str) -> Optional[str]:
-        """Try to download file using various methods (不使用代理)"""
+        """Try to download file using various methods (不使用代理)
+
+        统一先写 .part 临时文件,成功后原子改名到正式路径:中途失败不会
+        在缓存键上留下半截文件被下次 exists() 检查当成命中。
+        """
+        tmp_path = file_path.with_suffix(file_path.suffix + ".part")
         # Try method 1: curl_cffi with browser impersonation
         try:
             async with AsyncSession() as session:
@@ -179,13 +219,19 @@ class FileCache:
                     timeout=60,
                     headers=headers,
                     impersonate="chrome120",
-                    verify=False
+                    verify=False,
+                    stream=True
                 )
 
                 if response.status_code == 200:
-                    with open(file_path, 'wb') as f:
-                        f.write(response.content)
-                    debug_logger.log_info(f"File cached (curl_cffi): {filename} ({len(response.content)} bytes)")
+                    # 分块落盘:几百 MB 的视频不再整个压进内存
+                    total_bytes = 0
+                    with open(tmp_path, 'wb') as f:
+                        async for chunk in response.aiter_content(chunk_size=65536):
+                            f.write(chunk)
+                            total_bytes += len(chunk)
+                    os.replace(tmp_path, file_path)
+                    debug_logger.log_info(f"File cached (curl_cffi): {filename} ({total_bytes} bytes)")
                     return filename
                 elif response.status_code == 403:
                     raise Exception(f"HTTP 403 Forbidden")
@@ -193,18 +239,17 @@ class FileCache:
                     debug_logger.log_warning(f"curl_cffi failed with HTTP {response.status_code}, trying wget...")
 
         except Exception as e:
+            tmp_path.unlink(missing_ok=True)
             if "403" in str(e):
                 raise  # Re-raise 403 errors for retry logic
             debug_logger.log_warning(f"curl_cffi failed: {str(e)}, trying wget...")
 
         # Try method 2: wget command
         try:
-            import subprocess
-
             wget_cmd = [
                 "wget",
                 "-q",  # Quiet mode
-                "-O", str(file_path),  # Output file
+                "-O", str(tmp_path),  # Output file
                 "--timeout=60",
                 "--tries=3",
                 "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -216,18 +261,19 @@ class FileCache:
             # Add URL
             wget_cmd.append(url)
 
-            # Execute wget
-            result = subprocess.run(wget_cmd, capture_output=True, timeout=90)
+            # Execute wget (异步子进程:下载期间不阻塞事件循环)
+            stderr = await self._run_download_command(wget_cmd, "wget")
 
-            if result.returncode == 0 and file_path.exists():
-                file_size = file_path.stat().st_size
+            if tmp_path.exists() and stderr is None:
+                file_size = tmp_path.stat().st_size
                 if file_size > 0:
+                    os.replace(tmp_path, file_path)
                     debug_logger.log_info(f"File cached (wget): {filename} ({file_size} bytes)")
                     return filename
                 else:
                     raise Exception("Downloaded file is empty")
             else:
-                error_msg = result.stderr.decode('utf-8', errors='ignore') if result.stderr else "Unknown error"
+                error_msg = stderr if stderr else "Unknown error"
                 if "403" in error_msg:
                     raise Exception(f"HTTP 403 Forbidden (wget)")
                 debug_logger.log_warning(f"wget failed: {error_msg}, trying curl...")
@@ -235,19 +281,18 @@ class FileCache:
         except FileNotFoundError:
             debug_logger.log_warning("wget not found, trying curl...")
         except Exception as e:
+            tmp_path.unlink(missing_ok=True)
             if "403" in str(e):
                 raise  # Re-raise 403 errors for retry logic
             debug_logger.log_warning(f"wget failed: {str(e)}, trying curl...")
 
         # Try method 3: system curl command
         try:
-            import subprocess
-
             curl_cmd = [
                 "curl",
                 "-L",  # Follow redirects
                 "-s",  # Silent mode
-                "-o", str(file_path),  # Output file
+                "-o", str(tmp_path),  # Output file
                 "--max-time", "60",
                 "-H", "Accept: */*",
                 "-H", "Accept-Language: zh-CN,zh;q=0.9,en;q=0.8",
@@ -258,23 +303,25 @@ class FileCache:
             # Add URL
             curl_cmd.append(url)
 
-            # Execute curl
-            result = subprocess.run(curl_cmd, capture_output=True, timeout=90)
+            # Execute curl (异步子进程,同上)
+            stderr = await self._run_download_command(curl_cmd, "curl")
 
-            if result.returncode == 0 and file_path.exists():
-                file_size = file_path.stat().st_size
+            if tmp_path.exists() and stderr is None:
+                file_size = tmp_path.stat().st_size
                 if file_size > 0:
+                    os.replace(tmp_path, file_path)
                     debug_logger.log_info(f"File cached (curl): {filename} ({file_size} bytes)")
                     return filename
                 else:
                     raise Exception("Downloaded file is empty")
             else:
-                error_msg = result.stderr.decode('utf-8', errors='ignore') if result.stderr else "Unknown error"
+                error_msg = stderr if stderr else "Unknown error"
                 if "403" in error_msg:
                     raise Exception(f"HTTP 403 Forbidden (curl)")
                 raise Exception(f"curl command failed: {error_msg}")
 
         except Exception as e:
+            tmp_path.unlink(missing_ok=True)
             debug_logger.log_error(
                 error_message=f"Failed to download file: {str(e)}",
                 status_code=0,
@@ -299,13 +346,14 @@ class FileCache:
         """Clear all cached files"""
         try:
             removed_count = 0
-            for file_path in self.cache_dir.iterdir():
-                if file_path.is_file():
-                    try:
-                        file_path.unlink()
-                        removed_count += 1
-                    except Exception:
-                        pass
+            with os.scandir(self.cache_dir) as entries:
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False):
+                        try:
+                            os.unlink(entry.path)
+                            removed_count += 1
+                        except Exception:
+                            pass
 
             debug_logger.log_info(f"Cache cleared: removed {removed_count} files")
             return removed_count
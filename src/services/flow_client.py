@@ -20,6 +20,20 @@ class FlowClient:
         self.timeout = config.flow_timeout
         # 缓存每个账号的 User-Agent
         self._user_agent_cache = {}
+        # 复用 HTTP 会话:保持连接池/TLS 会话,省掉每次请求的握手开销
+        self._session: Optional[AsyncSession] = None
+
+    def _get_session(self) -> AsyncSession:
+        """获取共享的 AsyncSession (懒初始化,代理仍按请求级传入)"""
+        if self._session is None:
+            self._session = AsyncSession()
+        return self._session
+
+    async def close(self):
+        """关闭共享会话 (应用 shutdown 时调用)"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
 
     def _generate_user_agent(self, account_id: str = None) -> str:
         """基于账号ID生成固定的 User-Agent
@@ -155,38 +169,38 @@ class FlowClient:
         start_time = time.time()
 
         try:
-            async with AsyncSession() as session:
-                if method.upper() == "GET":
-                    response = await session.get(
-                        url,
-                        headers=headers,
-                        proxy=proxy_url,
-                        timeout=self.timeout,
-                        impersonate="chrome110"
-                    )
-                else:  # POST
-                    response = await session.post(
-                        url,
-                        headers=headers,
-                        json=json_data,
-                        proxy=proxy_url,
-                        timeout=self.timeout,
-                        impersonate="chrome110"
-                    )
-
-                duration_ms = (time.time() - start_time) * 1000
-
-                # Log response
-                if config.debug_enabled:
-                    debug_logger.log_response(
-                        status_code=response.status_code,
-                        headers=dict(response.headers),
-                        body=response.text,
-                        duration_ms=duration_ms
-                    )
-
-                response.raise_for_status()
-                return response.json()
+            session = self._get_session()
+            if method.upper() == "GET":
+                response = await session.get(
+                    url,
+                    headers=headers,
+                    proxy=proxy_url,
+                    timeout=self.timeout,
+                    impersonate="chrome110"
+                )
+            else:  # POST
+                response = await session.post(
+                    url,
+                    headers=headers,
+                    json=json_data,
+                    proxy=proxy_url,
+                    timeout=self.timeout,
+                    impersonate="chrome110"
+                )
+
+            duration_ms = (time.time() - start_time) * 1000
+
+            # Log response
+            if config.debug_enabled:
+                debug_logger.log_response(
+                    status_code=response.status_code,
+                    headers=dict(response.headers),
+                    body=response.text,
+                    duration_ms=duration_ms
+                )
+
+            response.raise_for_status()
+            return response.json()
 
         except Exception as e:
             duration_ms = (time.time() - start_time) * 1000
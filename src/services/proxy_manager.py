@@ -79,13 +79,23 @@ class ProxyManager:
         """Add a proxy to the pool"""
         return await self.db.add_proxy_pool_item(proxy_url, name)
 
-    async def get_all_pool_proxies(self) -> list:
-        """Get all proxies in the pool"""
-        return await self.db.get_all_proxy_pool_items()
+    async def get_all_pool_proxies(self, limit: int = None, offset: int = 0) -> list:
+        """Get proxies in the pool (optionally paginated)"""
+        return await self.db.get_all_proxy_pool_items(limit, offset)
 
-    async def update_pool_proxy(self, proxy_id: int, **kwargs):
-        """Update a proxy in the pool"""
-        await self.db.update_proxy_pool_item(proxy_id, **kwargs)
+    async def update_pool_proxy(
+        self,
+        proxy_id: int,
+        proxy_url: str = None,
+        name: str = None,
+        enabled: bool = None
+    ):
+        """Update a proxy in the pool (None 表示不修改该字段)"""
+        await self.db.update_proxy_pool_item(proxy_id, proxy_url, name, enabled)
+
+    async def toggle_pool_proxy(self, proxy_id: int):
+        """Flip a proxy's enabled flag, returning the new value (None if missing)"""
+        return await self.db.toggle_proxy_pool_item(proxy_id)
 
     async def delete_pool_proxy(self, proxy_id: int):
         """Delete a proxy from the pool"""
@@ -46,6 +46,10 @@ class TokenManager:
         """Disable a token"""
         await self.db.update_token(token_id, is_active=False)
 
+    async def disable_tokens_bulk(self, token_ids: List[int]):
+        """Disable multiple tokens in one round-trip (e.g. expired imports)"""
+        await self.db.disable_tokens(token_ids)
+
     # ========== Token添加 (支持Project创建) ==========
 
     async def add_token(
@@ -94,7 +98,7 @@ class TokenManager:
             if expires:
                 try:
                     at_expires = datetime.fromisoformat(expires.replace('Z', '+00:00'))
-                except:
+                except ValueError:
                     pass
 
         except Exception as e:
@@ -105,7 +109,7 @@ class TokenManager:
             credits_result = await self.flow_client.get_credits(at)
             credits = credits_result.get("credits", 0)
             user_paygate_tier = credits_result.get("userPaygateTier")
-        except:
+        except Exception:
             credits = 0
             user_paygate_tier = None
 
@@ -228,6 +232,24 @@ class TokenManager:
         if update_fields:
             await self.db.update_token(token_id, **update_fields)
 
+    async def ingest_session_token(
+        self,
+        token_id: int,
+        st: str,
+        at: str,
+        at_expires: Optional[datetime],
+        auto_enable: bool
+    ):
+        """插件上报的ST/AT刷新:单条UPDATE写入,必要时自动启用
+
+        新AT刚从ST换取,未过期,429禁用状态随写入一并清除
+        (与 update_token 的编辑保存语义一致)。
+        """
+        await self.db.update_token_session(token_id, st, at, at_expires, auto_enable)
+        if auto_enable:
+            # 与 enable_token 保持一致:启用时重置连续错误计数
+            await self.db.reset_error_count(token_id)
+
     # ========== AT自动刷新逻辑 (核心) ==========
 
     async def is_at_valid(self, token_id: int) -> bool:
@@ -327,7 +349,7 @@ class TokenManager:
             if expires:
                 try:
                     new_at_expires = datetime.fromisoformat(expires.replace('Z', '+00:00'))
-                except:
+                except ValueError:
                     pass
 
             # 更新数据库